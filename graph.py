@@ -15,6 +15,12 @@ parser_github.set_defaults(func=update)
 
 # download
 parser_download = subparsers.add_parser('download')
+parser_download.add_argument('--input', type=str, action='store', nargs='?', default='download.txt')
+parser_download.add_argument('--path', type=str, action='store', nargs='?', default='./dictionaries/')
+parser_download.add_argument('--jobs', type=int, action='store', nargs='?', default=8)
+parser_download.add_argument('--timeout', type=float, action='store', nargs='?', default=30)
+parser_download.add_argument('--retries', type=int, action='store', nargs='?', default=3)
+parser_download.add_argument('--force', action='store_true', default=False)
 parser_download.set_defaults(func=download)
 
 # create a list of files used
@@ -34,6 +40,8 @@ parser_recommend.set_defaults(func=recommend)
 #preprocessing (mono + bi dictionaries)
 parser_preproc = subparsers.add_parser('preprocessing')
 parser_preproc.add_argument('--input', type=str, action='store', nargs='?', default='filelist.txt')
+parser_preproc.add_argument('--force', action='store_true', default=False)
+parser_preproc.add_argument('--jobs', type=int, action='store', nargs='?', default=1)
 parser_preproc.set_defaults(func=preprocessing)
 
 # configuration file for a language pair
@@ -48,6 +56,7 @@ parser_addition.add_argument('lang1', type=str, action='store')
 parser_addition.add_argument('lang2', type=str, action='store')
 parser_addition.add_argument('--n', type=int, action='store', nargs='?', default=10)
 parser_addition.add_argument('--cutoff', type=int, action='store', nargs='?', default=4)
+parser_addition.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
 parser_addition.set_defaults(func=addition)
 
 # create a loading file (edges of graph)
@@ -66,20 +75,44 @@ parser_eval.add_argument('--topn', type=int, action='store', nargs='?', default=
 parser_eval.add_argument('--n_iter', type=int, action='store', nargs='?', default=3)
 parser_eval.add_argument('--cutoff', type=int, action='store', nargs='?', default=4)
 parser_eval.add_argument('--ncheck', type=int, action='store', nargs='?', default=1000)
+parser_eval.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_eval.add_argument('--scoring', type=str, action='store', nargs='?', default='paths', choices=['paths', 'walks'])
 parser_eval.set_defaults(func=eval_loop)
 
 # preview result
 parser_eval = subparsers.add_parser('preview')
 parser_eval.add_argument('lang1', type=str, action='store')
 parser_eval.add_argument('lang2', type=str, action='store')
+parser_eval.add_argument('--n', type=int, action='store', nargs='?', default=10)
 parser_eval.add_argument('--topn', type=int, action='store', nargs='?', default=None)
 parser_eval.add_argument('--cutoff', type=int, action='store', nargs='?', default=4)
+parser_eval.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_eval.add_argument('--scoring', type=str, action='store', nargs='?', default='paths', choices=['paths', 'walks'])
+parser_eval.add_argument('--jobs', type=int, action='store', nargs='?', default=1)
+parser_eval.add_argument('--incremental', action='store_true', default=False)
+parser_eval.add_argument('--no_cache', dest='cache', action='store_false', default=True)
 parser_eval.set_defaults(func=get_translations)
 
+# preview results for several pairs with one source language
+parser_multi = subparsers.add_parser('preview_multi')
+parser_multi.add_argument('lang1', type=str, action='store')
+parser_multi.add_argument('langs', type=str, action='store', nargs='+')
+parser_multi.add_argument('--n', type=int, action='store', nargs='?', default=10)
+parser_multi.add_argument('--topn', type=int, action='store', nargs='?', default=None)
+parser_multi.add_argument('--cutoff', type=int, action='store', nargs='?', default=4)
+parser_multi.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_multi.add_argument('--jobs', type=int, action='store', nargs='?', default=1)
+parser_multi.set_defaults(func=get_translations_multi)
+
 # convert to dix section
 parser_configure = subparsers.add_parser('convert')
 parser_configure.add_argument('lang1', type=str, action='store')
 parser_configure.add_argument('lang2', type=str, action='store')
+parser_configure.add_argument('--n', type=int, action='store', nargs='?', default=10)
+parser_configure.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_configure.add_argument('--scoring', type=str, action='store', nargs='?', default='paths', choices=['paths', 'walks'])
+parser_configure.add_argument('--no_cache', dest='cache', action='store_false', default=True)
+parser_configure.add_argument('--preview', action='store_true', default=False)
 parser_configure.set_defaults(func=convert_to_dix)
 
 #merge dialects
@@ -100,6 +133,8 @@ parser_example.add_argument('--lang', type=str, action='store', nargs='?', defau
 parser_example.add_argument('--config', action='store_true', default=False)
 parser_example.add_argument('--load', action='store_true', default=False)
 parser_example.add_argument('--output', action='store', type=str, default='')
+parser_example.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_example.add_argument('--no_cache', dest='cache', action='store_false', default=True)
 parser_example.set_defaults(func=example)
 
 #grid
@@ -110,8 +145,38 @@ parser_grid.add_argument('--n', type=int, action='store', nargs='*', default=[10
 parser_grid.add_argument('--topn', type=int, action='store', nargs='*', default=[None])
 parser_grid.add_argument('--cutoff', type=int, action='store', nargs='*', default=[4])
 parser_grid.add_argument('--ncheck', type=int, action='store', nargs='?', default=1000)
+parser_grid.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
 parser_grid.set_defaults(func=grid)
 
+#cached results
+parser_cache = subparsers.add_parser('cache')
+parser_cache.add_argument('action', type=str, action='store', choices=['stats', 'clear'])
+parser_cache.add_argument('--graphs', action='store_true', default=False)
+parser_cache.set_defaults(func=result_cache)
+
+#batch of pairs
+parser_batch = subparsers.add_parser('batch')
+parser_batch.add_argument('--input', type=str, action='store', nargs='?', default='pairs.txt')
+parser_batch.add_argument('--n', type=int, action='store', nargs='?', default=10)
+parser_batch.add_argument('--cutoff', type=int, action='store', nargs='?', default=4)
+parser_batch.add_argument('--topn', type=int, action='store', nargs='?', default=None)
+parser_batch.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_batch.add_argument('--jobs', type=int, action='store', nargs='?', default=1)
+parser_batch.add_argument('--overlap', type=float, action='store', nargs='?', default=0.8)
+parser_batch.set_defaults(func=batch)
+
+#serve
+parser_serve = subparsers.add_parser('serve')
+parser_serve.add_argument('lang1', type=str, action='store')
+parser_serve.add_argument('lang2', type=str, action='store')
+parser_serve.add_argument('--n', type=int, action='store', nargs='?', default=10)
+parser_serve.add_argument('--host', type=str, action='store', nargs='?', default='127.0.0.1')
+parser_serve.add_argument('--port', type=int, action='store', nargs='?', default=8000)
+parser_serve.add_argument('--jobs', type=int, action='store', nargs='?', default=1)
+parser_serve.add_argument('--engine', type=str, action='store', nargs='?', default='networkx', choices=['networkx', 'csr'])
+parser_serve.add_argument('--max_cutoff', type=int, action='store', nargs='?', default=5)
+parser_serve.set_defaults(func=serve)
+
 args = parser.parse_args()
 arg_spec = inspect.getargspec(args.func)
 if arg_spec.keywords:
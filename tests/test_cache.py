@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+from tool import func
+
+
+class Old:
+    pass
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(func, 'GRAPHS', './graphs/')
+    monkeypatch.setattr(func, 'RESULTS', './results/')
+
+
+@pytest.mark.parametrize('kind', ['snapshot', 'results'])
+@pytest.mark.parametrize('content', ['class', 'module', 'garbage', 'empty'])
+def test_unreadable_pickle_is_dropped(cache, monkeypatch, kind, content):
+    if kind == 'snapshot':
+        folder, read = func.GRAPHS, func.read_snapshot
+        func.write_snapshot('k', {'graph': Old()}, {'eng', 'spa'})
+    else:
+        folder, read = func.RESULTS, func.read_results
+        func.write_results('k', {'word': Old()}, {'languages': ['eng', 'spa']})
+    assert read('k') is not None
+    filename = folder + 'k.pickle'
+    if content == 'class': monkeypatch.delattr(sys.modules[__name__], 'Old')  # AttributeError
+    else:
+        with open(filename, 'wb') as f:
+            f.write({'module': b'cno_such_module\nOld\n.', 'garbage': b'\x80\x04K', 'empty': b''}[content])
+    assert read('k') is None
+    assert 'k' not in func.load_manifest(folder + 'manifest.json')
+    assert not os.path.exists(filename)
@@ -0,0 +1,55 @@
+import random
+from collections import Counter
+from math import exp
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from tool import func
+from tool.func import CSRGraph, Word
+
+
+def random_graph(seed, n=24, edges=70, langs=('eng', 'spa', 'cat')):
+    """Small multilingual graph: most translations go both ways, like
+    in parsed dictionaries"""
+    rnd = random.Random(seed)
+    words = [Word('w{}'.format(i), langs[i % len(langs)], ('n',)) for i in range(n)]
+    pairs = []
+    while len(pairs) < edges:
+        u, v = rnd.sample(range(n), 2)
+        if words[u].lang == words[v].lang: continue
+        pairs.append((u, v))
+        if rnd.random() < 0.7: pairs.append((v, u))
+    G = nx.DiGraph()
+    G.add_edges_from((words[u], words[v]) for u, v in pairs)
+    src, dst = zip(*pairs)
+    array = np.empty(n, dtype=object)
+    array[:] = words
+    return G, CSRGraph.from_edges(np.array(src), np.array(dst), array), rnd
+
+
+def reference(G, source, target, cutoff, exclude):
+    """Path lengths from NetworkX.all_simple_paths (old metric)"""
+    H = G.copy()
+    H.remove_edges_from(exclude or ())
+    return Counter([len(i) for i in nx.all_simple_paths(H, source, target, cutoff=cutoff)])
+
+
+@pytest.mark.parametrize('engine', ['networkx', 'csr'])
+@pytest.mark.parametrize('seed', range(4))
+def test_counts_and_coefficients_match_all_simple_paths(engine, seed):
+    G, csr, rnd = random_graph(seed)
+    graph = G if engine == 'networkx' else csr
+    nodes = list(G.nodes)
+    for source in rnd.sample(nodes, 3):
+        for exclude in (None, set(rnd.sample(list(G.edges), 8))):
+            for cutoff in range(1, 7):
+                func.SEARCH_CACHE.clear()
+                found = func.path_counts(graph, source, nodes, cutoff, exclude=exclude)
+                for target, counts in zip(nodes, found):
+                    expected = reference(G, source, target, cutoff, exclude)
+                    # same lengths in the same order, so sums are exactly the same
+                    assert list(counts.items()) == list(expected.items())
+                    coef = sum(exp(-i)*expected[i] for i in expected)
+                    assert func.metric(graph, source, target, cutoff, exclude=exclude) == coef
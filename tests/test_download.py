@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tool import func
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Dictionary server: files (name -> content) with ETag, names in
+    failing always get 503. Every request is logged as (name, status)."""
+    files, failing, log = {}, set(), []
+
+    def do_GET(self):
+        name = self.path.strip('/')
+        if name in self.failing: status = 503
+        elif name not in self.files: status = 404
+        else:
+            etag = '"{}"'.format(hashlib.sha256(self.files[name]).hexdigest())
+            status = 304 if self.headers.get('If-None-Match') == etag else 200
+        self.log.append((name, status))
+        self.send_response(status)
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(self.files[name])))
+            self.end_headers()
+            self.wfile.write(self.files[name])
+        else:
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def log_message(self, *args): pass
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Handler.files = {'apertium-eng-spa.eng-spa.dix': b'<dictionary>eng-spa</dictionary>',
+                     'apertium-eng-cat.eng-cat.dix': b'<dictionary>eng-cat</dictionary>'}
+    Handler.failing, Handler.log = set(), []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:{}/'.format(httpd.server_address[1])
+    with open('download.txt', 'w', encoding='utf-8') as f:
+        for name in sorted(Handler.files): f.write(url + name + '\n')
+    yield url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def run(retries=0):
+    Handler.log = []
+    func.download('download.txt', './dictionaries/', jobs=2, timeout=5, retries=retries)
+    return sorted(Handler.log)
+
+
+def test_download_then_not_modified(server):
+    assert run() == [('apertium-eng-cat.eng-cat.dix', 200), ('apertium-eng-spa.eng-spa.dix', 200)]
+    manifest = func.load_manifest('./dictionaries/manifest.json')
+    for name, content in Handler.files.items():
+        with open('./dictionaries/' + name, 'rb') as f: assert f.read() == content
+        assert manifest[server + name]['sha256'] == hashlib.sha256(content).hexdigest()
+    mtimes = [os.stat('./dictionaries/' + name).st_mtime_ns for name in sorted(Handler.files)]
+    assert run() == [('apertium-eng-cat.eng-cat.dix', 304), ('apertium-eng-spa.eng-spa.dix', 304)]
+    assert mtimes == [os.stat('./dictionaries/' + name).st_mtime_ns for name in sorted(Handler.files)]
+
+
+def test_server_error_then_resume(server, capsys):
+    Handler.failing = {'apertium-eng-cat.eng-cat.dix'}
+    log = run(retries=2)
+    # retried, then reported as missing
+    assert log.count(('apertium-eng-cat.eng-cat.dix', 503)) == 3
+    assert server + 'apertium-eng-cat.eng-cat.dix' in capsys.readouterr().out
+    assert not os.path.exists('./dictionaries/apertium-eng-cat.eng-cat.dix')
+    assert server + 'apertium-eng-cat.eng-cat.dix' not in func.load_manifest('./dictionaries/manifest.json')
+    # next run downloads only the missing file
+    Handler.failing = set()
+    assert run() == [('apertium-eng-cat.eng-cat.dix', 200), ('apertium-eng-spa.eng-spa.dix', 304)]
+    assert len(func.load_manifest('./dictionaries/manifest.json')) == 2
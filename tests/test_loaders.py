@@ -0,0 +1,62 @@
+import pytest
+
+from tool import func
+from tool.func import Word
+
+
+WORDS = {
+    'eng': [Word('eng dog', 'eng', ('n',)), Word('eng sun', 'eng', ()), Word('eng moon', 'eng', ('n', 'm'))],
+    'spa': [Word('spa dog', 'spa', ('n', 'f')), Word('spa sun', 'spa', ()), Word('spa moon', 'spa', ())],
+}
+
+
+def key(word):
+    return word.lang, word.lemma, tuple(i.tags for i in word.s)
+
+
+EDGES = [(0, 0, 0), (1, 1, 1), (2, 2, 2), (1, 2, 0)]
+SIDES = ['', 'LR', 'RL', 'other']
+
+
+@pytest.fixture
+def shard(tmp_path, monkeypatch):
+    """One parsed dictionary (eng-spa) with untagged words, written as
+    preprocessing does: monodix, binary storage and parsed copy."""
+    monkeypatch.chdir(tmp_path)
+    for folder in ('monodix', 'binary', 'parsed'):
+        (tmp_path / folder).mkdir()
+    for lang, words in WORDS.items():
+        with open('./monodix/{}.dix'.format(lang), 'w', encoding='utf-16') as f:
+            for word in words: f.write(word.write(mode='mono')+'\n')
+        func.write_mono_binary(lang, words)
+    with open('./parsed/eng-spa', 'w', encoding='utf-8') as f:
+        for l, r, side in EDGES:
+            f.write(SIDES[side]+'\t'+WORDS['eng'][l].write(mode='bi')+'\t'+WORDS['spa'][r].write(mode='bi')+'\n')
+    func.write_edges('eng-spa', EDGES)
+    return {'eng', 'spa'}
+
+
+def test_parse_tags_drops_empty_tags():
+    assert func.parse_tags('') == [func.Tags([])]
+    assert func.parse_tags('n-f$n') == [func.Tags(['n', 'f']), func.Tags(['n'])]
+    assert [i.tags for i in func.parse_tags('n--f$')] == [('n', 'f'), ()]
+
+
+def test_text_and_binary_graphs_are_the_same(shard):
+    text = func.built_from_parsed(shard)
+    binary = func.built_from_store(shard)
+    assert sorted(map(key, text.nodes)) == sorted(map(key, binary.nodes))
+    assert sorted((key(u), key(v)) for u, v in text.edges) == sorted((key(u), key(v)) for u, v in binary.edges)
+    for u, v in binary.edges: assert text.has_edge(u, v)
+    untagged = Word('eng sun', 'eng', func.parse_tags(''))
+    assert untagged in text and untagged in binary
+    assert text.has_edge(untagged, Word('spa sun', 'spa', func.parse_tags('')))
+
+
+def test_text_and_binary_monodix_are_the_same(shard):
+    binary = func.import_mono('eng')
+    func.os.remove(func.BINARY+'eng.npy')
+    text = func.import_mono('eng')
+    for word in WORDS['eng']:
+        assert text[word] == binary[word]
+        assert key(text[word]) == key(binary[word])
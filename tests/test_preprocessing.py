@@ -0,0 +1,132 @@
+import logging
+import os
+
+import pytest
+
+from tool import func
+
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<dictionary>\n<alphabet/>\n<sdefs><sdef n="n"/></sdefs>\n<section id="main" type="standard">\n'
+FOOTER = '</section>\n</dictionary>\n'
+
+
+def entry(left, right, side=''):
+    """<e> element: left and right are (lemma, tags) pairs"""
+    def word(lemma, tags):
+        return lemma + ''.join('<s n="{}"/>'.format(i) for i in tags)
+    r = ' r="{}"'.format(side) if side else ''
+    return '  <e{}><p><l>{}</l><r>{}</r></p></e>\n'.format(r, word(*left), word(*right))
+
+
+def entries(lang1, lang2, lemmas):
+    return [entry(('{}_{}'.format(lang1, i), ['n']), ('{}_{}'.format(lang2, i), ['n', 'f'])) for i in lemmas]
+
+
+def write_dix(path, lang1, lang2, body, complete=True):
+    filename = os.path.join(path, 'apertium-{0}-{1}.{0}-{1}.dix'.format(lang1, lang2))
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(HEADER + ''.join(body) + (FOOTER if complete else ''))
+    return os.path.abspath(filename)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ('tool', 'dictionaries'):
+        (tmp_path / folder).mkdir()
+    return tmp_path
+
+
+def preprocess(files, jobs=1):
+    with open('filelist.txt', 'w', encoding='utf-8') as f:
+        for file in files: f.write(file + '\n')
+    func.preprocessing('filelist.txt', jobs=jobs)
+    return func.load_manifest(func.PREPROCESSING_MANIFEST)
+
+
+def test_malformed_dictionary_is_skipped_and_retried(workdir, caplog):
+    good = write_dix('dictionaries', 'eng', 'spa', entries('eng', 'spa', ['dog', 'cat']))
+    body = entries('eng', 'cat', ['dog', 'cat', 'sun'])
+    bad = write_dix('dictionaries', 'eng', 'cat', body[:2] + [body[2][:20]], complete=False)
+    with caplog.at_level(logging.WARNING):
+        manifest = preprocess([good, bad])
+    assert bad in caplog.text
+    # nothing from the truncated file, not even entries before the error
+    assert open('parsed/eng-cat', encoding='utf-8').read() == ''
+    assert len(func.read_edges('eng-cat')) == 0
+    assert open('monodix/cat.dix', encoding='utf-16').read() == ''
+    assert bad not in manifest['parsed'] and good in manifest['parsed']
+    assert 'spa' in manifest['monodix']
+    assert 'eng' not in manifest['monodix'] and 'cat' not in manifest['monodix']
+    # fixed file is parsed on the next run
+    write_dix('dictionaries', 'eng', 'cat', body)
+    manifest = preprocess([good, bad])
+    assert len(open('parsed/eng-cat', encoding='utf-8').readlines()) == 3
+    assert bad in manifest['parsed'] and 'cat' in manifest['monodix']
+
+
+def test_entry_without_side_is_skipped(workdir):
+    body = entries('eng', 'spa', ['dog'])
+    body.append('  <e><p><l>eng_cat<s n="n"/></l></p></e>\n')
+    body += entries('eng', 'spa', ['sun'])
+    good = write_dix('dictionaries', 'eng', 'spa', body)
+    manifest = preprocess([good])
+    assert len(open('parsed/eng-spa', encoding='utf-8').readlines()) == 2
+    assert good in manifest['parsed']
+
+
+TAGS = [['n'], ['n', 'f'], ['n', 'm', 'sg'], ['vblex'], ['adj'], ['n', 'm']]
+SIDES = ['', '', 'LR', 'RL']
+
+
+def fixture_dix(path, lang1, lang2, size, shift=0):
+    """Dictionary with shared lemmas, several tag variants and sides"""
+    body = []
+    for i in range(size):
+        lemma = (i + shift) % 7
+        body.append(entry(('{}_{}'.format(lang1, lemma), TAGS[i % len(TAGS)]),
+                          ('{}_{}'.format(lang2, (lemma * 3) % 7), TAGS[(i + shift) % len(TAGS)]),
+                          SIDES[i % len(SIDES)]))
+    return write_dix(path, lang1, lang2, body)
+
+
+def outputs(path):
+    """All preprocessing outputs: relative name -> (content, mtime)"""
+    result = {}
+    for folder in ('monodix', 'parsed', 'binary'):
+        for name in sorted(os.listdir(os.path.join(path, folder))):
+            filename = os.path.join(path, folder, name)
+            with open(filename, 'rb') as f:
+                result[folder + '/' + name] = (f.read(), os.stat(filename).st_mtime_ns)
+    with open(os.path.join(path, 'tool', 'stats.csv'), 'rb') as f:
+        result['stats.csv'] = (f.read(), None)
+    return result
+
+
+def test_output_does_not_depend_on_jobs(tmp_path, monkeypatch):
+    sources = tmp_path / 'dictionaries'
+    sources.mkdir()
+    files = [fixture_dix(sources, 'eng', 'spa', 20), fixture_dix(sources, 'spa', 'cat', 15, 1),
+             fixture_dix(sources, 'eng', 'fra', 12, 2), fixture_dix(sources, 'fra', 'epo', 9, 3)]
+    runs = {}
+    for jobs in (1, 4):
+        (tmp_path / str(jobs) / 'tool').mkdir(parents=True)
+        monkeypatch.chdir(tmp_path / str(jobs))
+        preprocess(files, jobs=jobs)
+        runs[jobs] = outputs(tmp_path / str(jobs))
+    assert len(runs[1]) == len(runs[4]) == 24
+    for name in runs[1]: assert runs[1][name][0] == runs[4][name][0], name
+    # one changed input: only its languages and pairs with them are rebuilt
+    fixture_dix(sources, 'spa', 'cat', 16, 1)
+    changed = {}
+    for jobs in (1, 4):
+        monkeypatch.chdir(tmp_path / str(jobs))
+        manifest = preprocess(files, jobs=jobs)
+        assert sorted(manifest['parsed']) == sorted(files)
+        after = outputs(tmp_path / str(jobs))
+        changed[jobs] = set(i for i in after if after[i][1] != runs[jobs][i][1])
+        runs[jobs] = after
+    for name in runs[1]: assert runs[1][name][0] == runs[4][name][0], name
+    assert changed[1] == changed[4]
+    assert changed[1] == {'monodix/spa.dix', 'monodix/cat.dix', 'binary/spa.npy', 'binary/spa.str', 'binary/cat.npy', 'binary/cat.str',
+                          'parsed/spa-cat', 'parsed/eng-spa', 'binary/spa-cat.npy', 'binary/eng-spa.npy'}
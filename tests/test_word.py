@@ -0,0 +1,17 @@
+import itertools
+import random
+
+from tool.func import Tags, Word
+
+
+def test_less_than_on_masks():
+    rnd = random.Random(0)
+    tags = ['n', 'f', 'm', 'sg', 'vblex', 'adj']
+    words = [Word('x', 'eng', [Tags(sorted(rnd.sample(tags, rnd.randint(0, 3)))) for _ in range(rnd.randint(1, 3))])
+             for _ in range(150)]
+    for a, b in itertools.product(words, words):
+        # proper subset of variants, as with sets of Tags
+        assert (a < b) == (set(a.s) < set(b.s))
+    one, two = Word('x', 'eng', ('vblex',)), Word('x', 'eng', [Tags(['vblex']), Tags(['vblex', 'vbact'])])
+    assert one < two and not two < one and not one < one
+    assert not Word('y', 'eng', ('vblex',)) < two
@@ -1,8 +1,16 @@
-import logging, sys, os, requests, re
-from collections import Counter
+import logging, sys, os, requests, re, json, hashlib, shutil, pickle, time, threading, queue, tempfile
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from multiprocessing import Pool, get_context
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 from math import exp, log10
-from itertools import islice
+from itertools import islice, count
 import networkx as nx
+import numpy as np
 import xml.etree.ElementTree as ET
 from github import Github
 logging.basicConfig(format='%(asctime)s | %(levelname)s : %(message)s', level=logging.INFO, stream=sys.stdout)
@@ -13,34 +21,41 @@ import random
 #import numpy as np, scipy.stats as st
 from .data import lang_codes, rename, remove
 from tqdm import tqdm
+try: import fcntl
+except ImportError: fcntl = None # no manifest locks (Windows)
 requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
 import getpass
 
-def bisect(a, x, key=lambda x: x):
-    lo = 0
-    hi = len(a)
-    x_key = key(x) 
-    while lo < hi:
-        mid = (lo+hi)//2
-        if x_key < key(a[mid]): hi = mid
-        else: lo = mid+1
-    return lo
-
 # CLASSES
 
 class Word:
     """ Word object. One node in result graph. One word item containing
-    information (lemma, language, tags)"""
-    def __init__(self, lemma, lang, s=[]):
+    information (lemma, language, tags)
+    
+    Immutable: attributes are set once and hash is computed in
+    constructor (graph libraries hash nodes all the time)."""
+    __slots__ = ('lemma', 'lang', 's', '_hash', '_masks')
+    
+    def __init__(self, lemma, lang, s=()):
         """
         :param lemma (str): lemma
         :param lang (str): language
-        :param s (list): list of tags
+        :param s (Tags, list): tags or list of tag variants (Tags)
         """
-        if lemma == None: self.lemma = ''
-        else: self.lemma = lemma
-        self.lang = lang
-        self.s = s
+        if lemma == None: lemma = ''
+        if not isinstance(s, Tags):
+            s = tuple(s)
+            if not all(isinstance(i, Tags) for i in s): s = Tags(s)
+        object.__setattr__(self, 'lemma', lemma)
+        object.__setattr__(self, 'lang', lang)
+        object.__setattr__(self, 's', s)
+        object.__setattr__(self, '_hash', hash(str(self)))
+        object.__setattr__(self, '_masks', None)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('Word is immutable')
+    
+    def __reduce__(self): return (Word, (self.lemma, self.lang, self.s))
         
     def __str__(self):
         """
@@ -48,7 +63,7 @@ class Word:
         :rtype: str
         """
         if self.s:
-            if isinstance(self.s[0],list):
+            if isinstance(self.s[0], Tags):
                 w = '['+'_'.join(['-'.join(i) for i in self.s])+']'
             else: w = '['+'-'.join(self.s)+']'
         else: w = '-'
@@ -68,18 +83,29 @@ class Word:
     def __lt__(self, other):
         """
         Less than (self, other) : if self is equal and other has more
-        variants in tags.
+        variants in tags. Variants are compared by masks (see
+        variant_masks).
         
         :rtype: boolean
         """
         if self.lang == other.lang and self.lemma == other.lemma:
-            s1 = set(self.s)
-            s2 = set(other.s)
-            if (not s1 - s2) and (s1&s2==s1) and (s2 - s1): return True
-            else: return False
+            return self.variant_masks() < other.variant_masks()
         else: return False
     
-    def __hash__(self): return hash(str(self))
+    def variant_masks(self):
+        """
+        Masks of tag variants (one Tags object is one variant), computed
+        on first use and kept.
+        
+        :rtype: frozenset
+        """
+        if self._masks is None:
+            if isinstance(self.s, Tags): masks = frozenset([self.s.mask])
+            else: masks = frozenset(i.mask for i in self.s)
+            object.__setattr__(self, '_masks', masks)
+        return self._masks
+    
+    def __hash__(self): return self._hash
     
     def write(self, mode='mono'):
         """
@@ -102,8 +128,53 @@ class Word:
         elif mode == 'out' and len(self.s)<1: return self.lemma + '\t'+''
         elif mode == 'out'and len(self.s)>=1: return self.lemma + '\t' + str(self.s[0])
 
-class Tags(list):
-    """One set of tags (e.g. n+m+sg)"""
+TAG_BITS = {}
+
+def tag_mask(tags):
+    """
+    Bitmask of a tag sequence. Every distinct tag gets its own bit
+    when it is seen for the first time (interning table TAG_BITS), so
+    subset checks are integer operations.
+    
+    :param tags (iterable): tags
+    
+    :return: bitmask
+    :rtype: int
+    """
+    mask = 0
+    for tag in tags:
+        bit = TAG_BITS.get(tag)
+        if bit is None: bit = TAG_BITS[tag] = 1 << len(TAG_BITS)
+        mask |= bit
+    return mask
+
+class Tags:
+    """
+    One set of tags (e.g. n+m+sg)
+    
+    Immutable sequence of tags (tuple inside). Attribute mask is a
+    bitmask of tags (see tag_mask), comparisons of two Tags objects use
+    it instead of building sets.
+    """
+    __slots__ = ('tags', 'mask', '_hash')
+    
+    def __init__(self, tags=()):
+        self.tags = tuple(tags)
+        self.mask = tag_mask(self.tags)
+        self._hash = hash('-'.join(self.tags))
+    
+    def __reduce__(self):
+        """Bits are specific to a process, so they are recomputed after
+        unpickling (e.g. results from worker processes)"""
+        return (Tags, (self.tags,))
+    
+    def __iter__(self): return iter(self.tags)
+    
+    def __len__(self): return len(self.tags)
+    
+    def __getitem__(self, key): return self.tags[key]
+    
+    def __contains__(self, item): return item in self.tags
     
     def __le__(self, other):
         """
@@ -112,6 +183,7 @@ class Tags(list):
         
         :rtype: boolean
         """
+        if isinstance(other, Tags): return self.mask & other.mask == self.mask
         s1 = set(self)
         s2 = set(other)
         if not s1 - s2 and s1&s2==s1: return True
@@ -123,6 +195,7 @@ class Tags(list):
         
         :rtype: boolean
         """
+        if isinstance(other, Tags): return self.mask & other.mask == self.mask != other.mask
         s1 = set(self)
         s2 = set(other)
         if (not s1 - s2) and (s1&s2==s1) and (s2 - s1): return True
@@ -134,14 +207,17 @@ class Tags(list):
         
         :rtype: boolean
         """
-        if set(self) == set(other): return True
-        else: return False
-        
-    def __str__(self): return '-'.join(self)
+        if isinstance(other, Tags): return self.mask == other.mask
+        try:
+            if set(self) == set(other): return True
+        except TypeError: pass
+        return False
+    
+    def __str__(self): return '-'.join(self.tags)
     
     __repr__ = __str__
     
-    def __hash__(self): return hash(str(self))
+    def __hash__(self): return self._hash
 
 class WordDict(dict):
     """
@@ -163,6 +239,7 @@ class FilteredDict(dict):
     - set_lang : save language name
     - lemma : set lemma
     - add : add entry
+    - merge : add counts from another FilteredDict
     """
     def set_lang(self, lang): self.lang = lang
     
@@ -170,7 +247,7 @@ class FilteredDict(dict):
         
     def add(self, word):
         lemma = word.lang+'_'+word.lemma
-        tags = Tags(word.s)
+        tags = word.s if isinstance(word.s, Tags) else Tags(word.s)
         if lemma in self:
             if tags in self[lemma]: self[lemma][tags] += 1
             else: self[lemma][tags] = 1
@@ -178,45 +255,79 @@ class FilteredDict(dict):
             self[lemma] = WordDict()
             self[lemma].lemma(lemma)
             self[lemma][tags] = 1
+    
+    def merge(self, other):
+        """Adds counts from another FilteredDict (keeps first-seen order)"""
+        for lemma in other:
+            if lemma not in self:
+                self[lemma] = WordDict()
+                self[lemma].lemma(lemma)
+            for tags in other[lemma]:
+                if tags in self[lemma]: self[lemma][tags] += other[lemma][tags]
+                else: self[lemma][tags] = other[lemma][tags]
 
 class DiGetItem:
     """
     Word is a complex structure. Equality of objects doesn't mean that
     hash is the same (example in Word class). So we can't use hash to
-    find whether we already have this word or not. Search in non-hash
-    structures like list is inefficient.
+    find whether we already have this word or not.
     
     Dictionary : words with one tag variant. Hash can be used to get a
     word. It returns the same word.
     
-    List : word with multiple variants. List search (check all one by
-    one until we find the match). Returns full word (with all tags)
+    List : word with multiple variants.
+    
+    Index : (language, lemma) -> all words with this lemma (both
+    types). Returns full word (with all tags)
+    
+    Position : id of word -> order of adding (node number in binary
+    storage, see write_mono_binary)
+    
+    Lookup order: exact match (hash, then variant with the same tags),
+    untagged word, subset (first variant whose tags are all in the key
+    tags, key is more specific), superset (first variant that contains
+    all tags of the key, key is less specific).
     
     Methods:
     
     - add : adds word
-    - __getitem__ : return word (full or the same)
+    - __getitem__ : return word (full or the same), KeyError if there
+      is no such word
+    - get : same but returns default
     - __len__ : len(dict) + len(list)
     """
     def __init__(self):
         self.list = []
         self.dict = {}
+        self.index = {}
+        self.position = {}
     
     def add(self, word):
         if len (word.s) > 1: self.list.append(word)
         else: self.dict[word] = word
+        self.index.setdefault((word.lang, word.lemma), []).append(word)
+        self.position[id(word)] = len(self.position)
     
     def __getitem__(self, key):
-        key2 = Word(key.lemma, key.lang, [''])
         if key in self.dict: return self.dict[key]
-        else:
-            if key2 in self.dict: return self.dict[key2]
-            try:
-                i = bisect(self.list, key, key=str)
-                if self.list[i]==key: return self.list[i]
-                elif self.list[i+1]==key: return self.list[i+1]
-                elif self.list[i-1]==key: return self.list[i-1]
-            except: pass
+        candidates = self.index.get((key.lang, key.lemma), ())
+        mask = tag_mask(key.s)
+        subset, superset = None, None
+        for word in candidates:
+            for tags in word.s:
+                if tags.mask == mask: return word
+                if subset is None and tags.mask & mask == tags.mask: subset = word
+                if superset is None and tags.mask & mask == mask: superset = word
+        for word in candidates:
+            if len(word.s) == 1 and not word.s[0]: return word
+        if subset is not None: return subset
+        if superset is not None: return superset
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        try: return self[key]
+        except KeyError: return default
+    
     def __len__(self):
         return len(self.list)+len(self.dict)
 
@@ -233,6 +344,280 @@ class FilteredList(list):
     def lemma(self, value): return list(i for i in self if i.lemma == value)
     def lang(self, value): return list(i for i in self if i.lang == value)
 
+class LRUCache:
+    """
+    Bounded dictionary: least recently used keys are removed when there
+    are more than maxsize keys. Counts hits and misses.
+    """
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = self.misses = 0
+    
+    def get(self, key, default=None):
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+        self.misses += 1
+        return default
+    
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize: self.data.popitem(last=False)
+    
+    def clear(self):
+        self.data.clear()
+        self.hits = self.misses = 0
+    
+    def __len__(self): return len(self.data)
+    
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = round(self.hits / total * 100, 1) if total else 0
+        return 'hits: {}, misses: {} ({}%), size: {}/{}'.format(self.hits, self.misses, rate, len(self.data), self.maxsize)
+
+class CSRGraph:
+    """
+    Directed graph with integer nodes in CSR form (alternative to
+    NetworkX.DiGraph for big graphs).
+    
+    - words : Word for every node number
+    - ids : Word -> node number
+    - lang : language code of every node (codes - language -> code)
+    - indptr, indices : successors of node i are
+      indices[indptr[i]:indptr[i+1]] (in order of adding edges)
+    - removed : mask of removed edges (None if nothing was removed)
+    - _by_lang, _lang_keys : edge positions sorted by source node and
+      language of target node (see lang_neighbors)
+    
+    It has the same small interface that search functions use:
+    word in G, G.nodes(), G.neighbors(word), G.out_degree(word),
+    G.has_edge(u, v), G.remove_edge(u, v). Candidate search (candidates) and path
+    counting (path_lengths) work on node numbers.
+    """
+    def __init__(self, words, indptr, indices):
+        self.words = words
+        self.ids = {word: i for i, word in enumerate(words)}
+        self.langs = sorted(set(word.lang for word in words))
+        self.codes = {lang: i for i, lang in enumerate(self.langs)}
+        self.lang = np.array([self.codes[word.lang] for word in words], dtype=np.int16)
+        self.indptr = indptr
+        self.indices = indices
+        self.removed = None
+        self.graph = {}
+        src = np.repeat(np.arange(len(words), dtype=np.int64), np.diff(indptr))
+        keys = src * len(self.langs) + self.lang[indices]
+        self._by_lang = np.argsort(keys, kind='stable')
+        self._lang_keys = keys[self._by_lang]
+        self._seen = np.zeros(len(words), dtype=np.int64)
+        self._rindptr = self._rpositions = self._rsources = None
+        self._token = 0
+    
+    @classmethod
+    def from_edges(cls, src, dst, words):
+        """
+        Graph from edge arrays. Nodes are numbered in order of first
+        appearance, repeated edges are dropped, order of successors is
+        order of edges (same as NetworkX.DiGraph built with add_edge).
+        
+        :param src, dst (numpy.ndarray): numbers of words
+        :param words (numpy.ndarray): Word objects (object array)
+        
+        :rtype: CSRGraph
+        """
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        sequence = np.empty(2 * len(src), dtype=np.int64)
+        sequence[0::2], sequence[1::2] = src, dst
+        # equal words with different numbers are one node
+        used = np.unique(sequence)
+        canonical = {}
+        same = np.array([canonical.setdefault(word, i) for i, word in zip(used.tolist(), words[used])], dtype=np.int64)
+        sequence = same[np.searchsorted(used, sequence)]
+        src, dst = sequence[0::2], sequence[1::2]
+        numbers, first = np.unique(sequence, return_index=True)
+        order = np.argsort(first, kind='stable')
+        ids = np.empty(len(numbers), dtype=np.int64)
+        ids[order] = np.arange(len(numbers))
+        src, dst = ids[np.searchsorted(numbers, src)], ids[np.searchsorted(numbers, dst)]
+        n = len(numbers)
+        first = np.unique(src * n + dst, return_index=True)[1]
+        keep = np.sort(first)
+        src, dst = src[keep], dst[keep]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        indices = dst[np.argsort(src, kind='stable')].astype(np.int32)
+        return cls(words[numbers[order]], indptr, indices)
+    
+    def __contains__(self, word): return word in self.ids
+    
+    def __iter__(self): return iter(self.words)
+    
+    def __len__(self): return len(self.words)
+    
+    def nodes(self): return self
+    
+    def number_of_nodes(self): return len(self.words)
+    
+    def number_of_edges(self):
+        if self.removed is None: return len(self.indices)
+        return int(len(self.indices) - self.removed.sum())
+    
+    def predecessors(self, i):
+        """
+        Same as successors for incoming edges (reverse index is built
+        on first use).
+        
+        :param i (int): node number
+        
+        :return: numbers of predecessors
+        :rtype: list
+        """
+        if self._rindptr is None:
+            n = len(self.words)
+            self._rpositions = np.argsort(self.indices, kind='stable')
+            self._rsources = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.indptr))[self._rpositions]
+            self._rindptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=n), out=self._rindptr[1:])
+        a, b = self._rindptr[i], self._rindptr[i+1]
+        if self.removed is None: return self._rsources[a:b].tolist()
+        return self._rsources[a:b][~self.removed[self._rpositions[a:b]]].tolist()
+    
+    def successors(self, i):
+        """
+        :param i (int): node number
+        
+        :return: numbers of successors
+        :rtype: list
+        """
+        a, b = self.indptr[i], self.indptr[i+1]
+        if self.removed is None: return self.indices[a:b].tolist()
+        return self.indices[a:b][~self.removed[a:b]].tolist()
+    
+    def neighbors(self, word):
+        return iter(self.words[self.successors(self.ids[word])])
+    
+    def out_degree(self, word):
+        i = self.ids[word]
+        if self.removed is None: return int(self.indptr[i+1] - self.indptr[i])
+        return int((~self.removed[self.indptr[i]:self.indptr[i+1]]).sum())
+    
+    def lang_neighbors(self, word, lang):
+        """
+        Successors in one language (in order of neighbors) - binary
+        search in edges sorted by source and target language.
+        
+        :param word (Word): node
+        :param lang (str): language
+        
+        :rtype: list
+        """
+        if lang not in self.codes: return []
+        key = self.ids[word] * len(self.langs) + self.codes[lang]
+        a, b = np.searchsorted(self._lang_keys, [key, key + 1])
+        positions = self._by_lang[a:b]
+        if self.removed is not None: positions = positions[~self.removed[positions]]
+        return list(self.words[self.indices[positions]])
+    
+    def _edge(self, u, v):
+        """Position of edge u -> v in indices (None if there is no such edge)"""
+        if u not in self.ids or v not in self.ids: return None
+        a, b = self.indptr[self.ids[u]], self.indptr[self.ids[u]+1]
+        for pos in np.flatnonzero(self.indices[a:b] == self.ids[v]) + a:
+            if self.removed is None or not self.removed[pos]: return pos
+        return None
+    
+    def has_edge(self, u, v): return self._edge(u, v) is not None
+    
+    def remove_edge(self, u, v):
+        pos = self._edge(u, v)
+        if pos is None: raise nx.NetworkXError('The edge {}-{} not in graph.'.format(u, v))
+        if self.removed is None: self.removed = np.zeros(len(self.indices), dtype=bool)
+        self.removed[pos] = True
+        self.graph.pop('version', None)
+        self.graph.pop('walk_matrix', None)
+    
+    def _positions(self, edges):
+        """Positions of edges (pairs of words) in indices"""
+        positions = [self._edge(u, v) for u, v in edges or ()]
+        return np.array([i for i in positions if i is not None], dtype=np.int64)
+    
+    def _next_level(self, nodes, skip=None, code=None):
+        """
+        Successors of all nodes (ordered, without repetitions), only in
+        language code if it is set (lang_neighbors of all nodes)
+        """
+        if code is None:
+            starts = self.indptr[nodes]
+            lens = self.indptr[nodes + 1] - starts
+        else:
+            keys = nodes * len(self.langs) + code
+            starts = np.searchsorted(self._lang_keys, keys)
+            lens = np.searchsorted(self._lang_keys, keys + 1) - starts
+        total = int(lens.sum())
+        if not total: return np.empty(0, dtype=np.int64)
+        positions = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(total)
+        if code is not None: positions = self._by_lang[positions]
+        if self.removed is not None: positions = positions[~self.removed[positions]]
+        if skip is not None and len(skip): positions = positions[~np.isin(positions, skip)]
+        successors = self.indices[positions]
+        return successors[np.sort(np.unique(successors, return_index=True)[1])]
+    
+    def candidates(self, source, lang, cutoff, exclude=None):
+        """
+        Same as bidirectional_candidates, one BFS level at a time with
+        array operations.
+        
+        :param source (Word): node (word)
+        :param lang (str): target language
+        :param cutoff (int): cutoff
+        :param exclude (set): edges (pairs of words) hidden for this
+        search
+        
+        :return: list of candidates
+        :rtype: list
+        """
+        code = self.codes.get(lang, -1)
+        skip = self._positions(exclude)
+        self._token += 1
+        level = 0
+        nextlevel = np.array([self.ids[source]], dtype=np.int64)
+        result = []
+        while len(nextlevel) and cutoff >= level and len(result) < 10:
+            thislevel = nextlevel[self._seen[nextlevel] != self._token]
+            self._seen[thislevel] = self._token
+            target = self.lang[thislevel] == code
+            result.extend(thislevel[target].tolist())
+            if level >= cutoff: break
+            if level + 1 >= cutoff and code >= 0: nextlevel = self._next_level(thislevel[~target], skip, code)
+            else: nextlevel = self._next_level(thislevel[~target], skip)
+            level += 1
+        return list(self.words[result])
+    
+    def path_lengths(self, source, targets, cutoff, exclude=None):
+        """
+        Number of simple paths from source to every target with at most
+        cutoff edges by length (number of nodes in path, like
+        len(path) for paths from NetworkX.all_simple_paths).
+        
+        :param source (Word): node
+        :param targets (list): nodes
+        :param cutoff (int): cutoff
+        :param exclude (set): edges (pairs of words) hidden for this
+        search
+        
+        :return: Counter for every target
+        :rtype: list
+        """
+        skip = set((self.ids[u], self.ids[v]) for u, v in exclude or () if u in self.ids and v in self.ids)
+        successors, predecessors = self.successors, self.predecessors
+        if skip:
+            successors = lambda x: [i for i in self.successors(x) if (x, i) not in skip]
+            predecessors = lambda x: [i for i in self.predecessors(x) if (i, x) not in skip]
+        targets = [self.ids[i] for i in targets]
+        return count_paths(successors, predecessors, self.ids[source], targets, cutoff)
+
 # LOADING
 
 def l(lang):
@@ -269,25 +654,223 @@ def update():
             except: pass
 #                print (repo)
 
-def download():
+def _sha256(filename):
+    """
+    Content hash of a file on disk (None if there is no such file)
+    
+    :param filename (str): path to file
+    
+    :return: hex digest
+    :rtype: str
+    """
+    if not os.path.exists(filename): return None
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): h.update(chunk)
+    return h.hexdigest()
+
+def load_manifest(filename):
+    """
+    Reads JSON manifest (url or key -> record). Missing or broken file
+    means empty manifest, so everything is simply rebuilt.
+    
+    :param filename (str): manifest path
+    
+    :return: manifest
+    :rtype: dict
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f: return json.load(f)
+    except (IOError, ValueError): return {}
+
+def save_manifest(manifest, filename):
+    """
+    Writes manifest atomically (temporary file + rename) so an
+    interrupted run never leaves a half-written manifest.
+    
+    :param manifest (dict): manifest
+    :param filename (str): manifest path
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', suffix='.tmp')
+    with open(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, filename)
+
+@contextmanager
+def locked_manifest(filename):
+    """
+    Manifest that several processes change (graph snapshots and cached
+    results of batch workers): load, change and save are done under an
+    exclusive lock of '<manifest>.lock', so changes of other processes
+    are not lost.
+    
+    with locked_manifest(filename) as manifest: manifest[key] = record
+    
+    :param filename (str): manifest path
+    
+    :yield: manifest (saved after the block)
+    :ytype: dict
+    """
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename+'.lock', 'a') as lock:
+        if fcntl is not None: fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            manifest = load_manifest(filename)
+            yield manifest
+            save_manifest(manifest, filename)
+        finally:
+            if fcntl is not None: fcntl.flock(lock, fcntl.LOCK_UN)
+
+def dump_pickle(obj, filename):
+    """
+    Writes pickle atomically: a temporary file unique for this process
+    in the same directory, then rename.
+    
+    :param obj : object
+    :param filename (str): file path
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', suffix='.tmp')
+    try:
+        with open(fd, 'wb') as f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def load_pickle(folder, key):
+    """
+    Reads pickle <folder><key>.pickle listed in <folder>manifest.json
+    and marks it as recently used. A file that can't be loaded (missing,
+    broken or stale - e.g. pickled before a class changed) is removed
+    with its manifest record, so it is built again.
+    
+    :param folder (str): cache directory
+    :param key (str): key
+    
+    :return: object (None if there is no such key or it can't be read)
+    """
+    manifest_file = folder+'manifest.json'
+    if key not in load_manifest(manifest_file): return None
+    filename = folder+key+'.pickle'
+    try:
+        with open(filename, 'rb') as f: obj = pickle.load(f)
+    except Exception as e:
+        logging.warning('{}: {}, removed from cache'.format(filename, e))
+        with locked_manifest(manifest_file) as manifest:
+            manifest.pop(key, None)
+            if os.path.exists(filename): os.remove(filename)
+        return None
+    with locked_manifest(manifest_file) as manifest:
+        if key in manifest: manifest[key]['used'] = time.time()
+    return obj
+
+def _session(jobs, retries):
+    """
+    One shared HTTP session for all workers: keep-alive connection pool
+    sized for the worker pool and retries with backoff on server errors.
+    
+    :param jobs (int): number of workers
+    :param retries (int): number of retries
+    
+    :rtype: requests.Session
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=jobs, pool_maxsize=jobs, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _fetch(session, url, filename, record, timeout):
+    """
+    Downloads one dictionary. If we have a manifest record and the
+    file on disk is still the one we downloaded, the request is
+    conditional (ETag / Last-Modified) and '304 Not Modified' means
+    nothing to do.
+    
+    :param session (requests.Session): shared session
+    :param url (str): dictionary url
+    :param filename (str): where to save it
+    :param record (dict): manifest record from previous run (or None)
+    :param timeout (float): request timeout in seconds
+    
+    :return: status ('new', 'updated', 'unchanged', 'error'), record
+    :rtype: str, dict
+    """
+    headers = {}
+    if record and record.get('sha256') == _sha256(filename):
+        if record.get('etag'): headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'): headers['If-Modified-Since'] = record['last_modified']
+    else: record = None
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304: return 'unchanged', record
+    content = response.content
+    if response.status_code != 200 or b'502: Failure' in content or b'Error 503' in content:
+        return 'error', record
+    new = {'etag': response.headers.get('ETag'),
+           'last_modified': response.headers.get('Last-Modified'),
+           'sha256': hashlib.sha256(content).hexdigest(),
+           'file': os.path.basename(filename)}
+    if record and record['sha256'] == new['sha256']: return 'unchanged', new
+    tmp = filename + '.part'
+    try:
+        with open(tmp, 'wb') as f: f.write(content)
+        os.replace(tmp, filename)
+    except OSError:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    if record: return 'updated', new
+    return 'new', new
+
+def download(input='download.txt', path='./dictionaries/', jobs=8, timeout=30, retries=3, force=False):
+    """
+    Downloads all bilingual dictionaries from the list with a pool of
+    workers sharing one session. Manifest (path/manifest.json) keeps
+    ETag, Last-Modified and sha256 of every file, so unchanged files
+    are not downloaded again and an interrupted run continues from
+    where it stopped.
+    
+    :param input (str): file with urls (one per line)
+    :param path (str): directory for dictionaries
+    :param jobs (int): number of parallel downloads
+    :param timeout (float): request timeout in seconds
+    :param retries (int): number of retries for server errors
+    :param force (bool): ignore manifest and download everything
+    
+    Network and disk errors (OSError) of one file don't stop other
+    downloads, the file is reported as missing.
+    """
+    if not os.path.exists(path): os.makedirs(path)
+    manifest_file = os.path.join(path, 'manifest.json')
+    if force: manifest = {}
+    else: manifest = load_manifest(manifest_file)
+    with open(input, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+    session = _session(jobs, retries)
+    counts = Counter()
     error_list = []
-    if not os.path.exists('./dictionaries/'): os.makedirs('./dictionaries/')
-    with open('download.txt', 'r', encoding='utf-8') as f:
-        for line in tqdm(f.readlines()):
-            bidix = line.strip()
-            try:
-                filename = './dictionaries/'+bidix.split('/')[-1]
-                response = requests.get(bidix)
-                response.encoding = 'UTF-8'
-                text = response.text
-                if '502: Failure' in text or 'Error 503' in text: error_list.append(bidix)
-                else:
-                    with open(filename, 'w', encoding='UTF-8') as f: f.write(text)
-            except:
-                pass
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for url in urls:
+            filename = os.path.join(path, url.split('/')[-1])
+            futures[pool.submit(_fetch, session, url, filename, manifest.get(url), timeout)] = url
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            url = futures[future]
+            try: status, record = future.result()
+            except (requests.RequestException, OSError) as e:
+                logging.debug('{}: {}'.format(url, e))
+                status, record = 'error', None
+            counts[status] += 1
+            if status == 'error': error_list.append(url)
+            elif record:
+                manifest[url] = record
+                save_manifest(manifest, manifest_file)
+    session.close()
+    logging.info('Downloaded: new {}, updated {}, unchanged {}, errors {}'.format(
+        counts['new'], counts['updated'], counts['unchanged'], counts['error']))
     if error_list:
-        print ('Some server errors occured while downloading. Please, try again later. Missing files are:\n')
-        for i in error_list:
+        print ('Some errors (server or disk) occured while downloading. Please, try again later. Missing files are:\n')
+        for i in sorted(error_list):
             print (i)
 
 def list_files(path='./dictionaries/', dialects = False, output='filelist.txt'):
@@ -376,10 +959,24 @@ def split_dialects(input):
 
 # PREPROCESSING AND BUILDING
 
+PREPROCESSING_MANIFEST = './preprocessing.json'
+PREPROCESSING_VERSION = 3
+BINARY = './binary/'
+SIDES = {'': 0, 'LR': 1, 'RL': 2}
+EDGE_TYPE = np.dtype([('l', '<i4'), ('r', '<i4'), ('side', 'i1')])
+GRAPHS = './graphs/'
+GRAPH_CACHE_SIZE = 2 << 30 # bytes, all snapshots together
+GRAPH_VERSION = 4 # snapshots of older versions are not used
+
 def all_languages(input):
     """
     Set of all languages in bilingual dictionaries. This set is used
     for monolingual dictionaries.
+    
+    :param input (str): file list
+    
+    :return: languages (also written to './tool/langs.py')
+    :rtype: set
     """
     s = set()
     with open ('./tool/langs.py','w',encoding='utf-8') as outp:
@@ -388,6 +985,88 @@ def all_languages(input):
                 name = [l(i) for i in line.split('.')[-2].split('-')]
                 s.update(name)
         outp.write('langs='+str(s))
+    return s
+
+def _pmap(func, items, jobs=1):
+    """
+    Ordered map: in a process pool if jobs > 1, otherwise in this
+    process. Results come in the same order as items.
+    
+    :param func (function): module-level function of one argument
+    :param items (list): arguments
+    :param jobs (int): number of processes
+    
+    :yield: results
+    """
+    if jobs > 1 and len(items) > 1:
+        with Pool(min(jobs, len(items))) as pool:
+            for result in pool.imap(func, items): yield result
+    else:
+        for item in items: yield func(item)
+
+def _file_words(args):
+    """
+    Words of one bilingual dictionary counted for each side (worker for
+    language_dicts). Malformed file gives no words at all (not the
+    entries before the error).
+    
+    :param args (tuple): file, pair of language names, sides needed
+    (left, right)
+    
+    :return: left and right dictionaries, whether the file was parsed
+    :rtype: FilteredDict, FilteredDict, bool
+    """
+    file, pair, (need_left, need_right) = args
+    left, right = FilteredDict(), FilteredDict()
+    left.set_lang(pair[0])
+    right.set_lang(pair[1])
+    try:
+        for word1, word2, _ in parse_bidix(file, pair[0], pair[1]):
+            if need_left: left.add(word1)
+            if need_right: right.add(word2)
+    except ET.ParseError as e:
+        logging.warning('{}: {}, file is skipped'.format(file, e))
+        left, right = FilteredDict(), FilteredDict()
+        left.set_lang(pair[0])
+        right.set_lang(pair[1])
+        return left, right, False
+    return left, right, True
+
+def language_dicts(langs, input, jobs=1, broken=None):
+    """
+    It gathers all words for several languages in one pass over the
+    file list: every bilingual dictionary is parsed once and its left
+    and right words go to dictionaries of their languages. Files can be
+    parsed in worker processes, counts are merged in file list order,
+    so result doesn't depend on jobs.
+    
+    :param langs (iterable): language names
+    :param input (str): file list
+    :param jobs (int): number of processes
+    :param broken (set): languages with a malformed source file are
+    added here (their dictionaries are incomplete)
+    
+    :return: language name -> dictionary
+    :rtype: dict
+    """
+    dictionaries = {}
+    for lang in langs:
+        dictionaries[lang] = FilteredDict()
+        dictionaries[lang].set_lang(lang)
+    tasks = []
+    with open (input,'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip('\n')
+            pair = [l(i) for i in line.split('.')[-2].split('-')]
+            if '-'.join(pair) in rename: pair = rename['-'.join(pair)].split('-')
+            sides = (pair[0] in dictionaries, pair[0] != pair[1] and pair[1] in dictionaries)
+            if any(sides): tasks.append((line, pair, sides))
+    for (line, pair, sides), (left, right, parsed) in zip(tasks, _pmap(_file_words, tasks, jobs)):
+        if sides[0]: dictionaries[pair[0]].merge(left)
+        if sides[1]: dictionaries[pair[1]].merge(right)
+        if not parsed and broken is not None:
+            broken.update(lang for lang, side in zip(pair, sides) if side)
+    return dictionaries
 
 def one_language_dict(lang, input):
     """
@@ -399,22 +1078,7 @@ def one_language_dict(lang, input):
     :return: dictionary
     :rtype: FilteredDict
     """
-    dictionary = FilteredDict()
-    dictionary.set_lang(lang)
-    with open (input,'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip('\n')
-            pair = [l(i) for i in line.split('.')[-2].split('-')]
-            if '-'.join(pair) in rename: pair = rename['-'.join(pair)].split('-')
-            if lang in pair:
-                if lang == pair[0]: side = 'l'
-                else: side = 'r'
-                try:
-                    with open (line, 'r', encoding='utf-8') as d:
-                        t = ET.fromstring(d.read().replace('<b/>',' ').replace('<.?g>',''))
-                    for word in parse_one(t, side, lang): dictionary.add(word)
-                except: pass
-    return dictionary
+    return language_dicts([lang], input)[lang]
 
 def shorten(word_dict):
     """
@@ -434,66 +1098,69 @@ def shorten(word_dict):
     :return: lemma + structured tags
     :rtype: str, list
     """
-    short = []
+    short, masks = [], []
     for i in sorted(word_dict, key=lambda x: (word_dict[x], -len(x)), reverse=True):
-        new, add = True, True
-        for key, j in enumerate(short):
-            if not add: break
-            inner = True
-            for key2, k in enumerate(j):
-                if (k < i) or (i < k): pass
-                else: inner = False
-            if inner: 
+        mask = i.mask
+        for key, j in enumerate(masks):
+            # tag sets are comparable (one is strict subset of another)
+            if all(k != mask and k & mask in (k, mask) for k in j):
                 short[key].append(i)
-                new = False
-                add = False
-        if new: short.append([i])
+                j.append(mask)
+                break
+        else:
+            short.append([i])
+            masks.append([mask])
     word = word_dict.lemma[4:]
     return word, short
 
+def lemma_text(word):
+    """
+    Lemma of one word element: text with <b/> as a space and content
+    of <g> (invariable part of multiword) included. Tags (<s>) and
+    other elements are skipped.
+    
+    :param word (Element): l, r or i element (or g inside it)
+    
+    :return: lemma
+    :rtype: str
+    """
+    text = [word.text or '']
+    for child in word:
+        if child.tag == 'b': text.append(' ' + (child.tail or ''))
+        elif child.tag == 'g': text.append(lemma_text(child) + (child.tail or ''))
+    return ''.join(text)
+
 def one_word(word, lang):
     """
     One word parsing: lemma, tags, wrap in Word class
     
-    :param word (ElementTree): one word from .dix file (left or right
+    :param word (Element): one word from .dix file (left or right
     side)
     :param lang (str): language name
     
     :return: Word object with tags
     :rtype: Word
     """
-    if word.text: st = str(word.text)
-    else: st = ''
-    s = [i.attrib['n'] for i in word.findall('.//s')]
-    s = [i for i in s if i != '']
+    st = lemma_text(word)
+    if '_' in st: st = st.replace('_',' ')
+    s = Tags([i.attrib['n'] for i in word.iter('s') if i.attrib.get('n')])
     return Word(st, lang, s)
 
-def parse_one (tree, side, lang):
+def parse_one (file, side, lang):
     """
-    Yields all words (Word objects) from one bilingual dictionary.
+    Yields all words (Word objects) of one language from one bilingual
+    dictionary.
     
-    :param tree (etree.ElementTree): etree.ElementTree object from 
-    .dix file
+    :param file (str): .dix file
     :param side (str): which side is the language we parse
     :param lang (str): language name
     
     :yield: Word objects of words
     :ytype: Word
     """
-    all = tree.findall('section')
-    for tree in all:
-        for e in tree:
-            p = e.find('p')
-            if p:
-                word = one_word(p.find(side), lang)
-                yield word
-            else:
-                i = e.find('i')
-                if i:
-                    word = one_word(i, lang)
-                    yield word
-                else:
-                    pass
+    for word1, word2, _ in parse_bidix(file, lang, lang):
+        if side == 'l': yield word1
+        else: yield word2
 
 def dictionary_to_nodes(dictionary):
     """
@@ -510,27 +1177,52 @@ def dictionary_to_nodes(dictionary):
         if '_' in word:
             word = word.replace('_', ' ')
         for tag in tags:
-            yield Word(word, dictionary.lang, Tags([i for i in tag if i != '']))
+            yield Word(word, dictionary.lang, tuple(tag))
 
-def monodix(input):
+def monodix(input, manifest=None, hashes=None, jobs=1):
     """
     Creates artificially created monolingual dictionaries with words
     that have all tag variants and ready to be used in bilingual
     dictionary parsing.
     
     For each language in list of languages this function creates a
-    dictionary.
+    dictionary (text and binary, see write_mono_binary). With manifest
+    only languages whose source dictionaries changed are rebuilt.
+    Language with a malformed source file is not recorded in manifest,
+    so it is rebuilt next time.
+    
+    :param input (str): file list
+    :param manifest (dict): preprocessing manifest (see preprocessing)
+    :param hashes (dict): content hashes of source files
+    :param jobs (int): number of processes for parsing
     """
     logging.info('Started monolingual dictionaries')
     if not os.path.exists('./monodix/'):
         os.makedirs('./monodix/')
-    for lang in tqdm(langs):
-    #for lang in langs:
-        dictionary = one_language_dict(lang, input)
+    if manifest is None: manifest = {}
+    keys = {}
+    for lang in langs:
+        keys[lang] = None
+        if hashes is not None:
+            keys[lang] = monodix_key(lang, input, hashes)
+            if manifest.get('monodix', {}).get(lang) == keys[lang] and os.path.exists('./monodix/'+lang+'.dix') and os.path.exists(BINARY+lang+'.npy'):
+                del keys[lang]
+    if not os.path.exists(BINARY): os.makedirs(BINARY)
+    broken = set()
+    dictionaries = language_dicts(keys, input, jobs=jobs, broken=broken)
+    for lang in tqdm(sorted(keys)):
+        words = list(dictionary_to_nodes(dictionaries.pop(lang)))
         with open ('./monodix/'+lang+'.dix', 'w', encoding = 'utf-16') as f:
-            for i in dictionary_to_nodes(dictionary):
+            for i in words:
                 f.write (i.write(mode='mono')+'\n')
-    logging.info('Finished monolingual dictionaries')
+        write_mono_binary(lang, words)
+        if lang in broken:
+            if manifest.get('monodix', {}).pop(lang, None):
+                save_manifest(manifest, PREPROCESSING_MANIFEST)
+        elif keys[lang]:
+            manifest.setdefault('monodix', {})[lang] = keys[lang]
+            save_manifest(manifest, PREPROCESSING_MANIFEST)
+    logging.info('Finished monolingual dictionaries (unchanged: {})'.format(len(langs) - len(keys)))
 
 def check (word1, word2, l1, l2):
     """This function gets word with tags from real bilingual dictionary
@@ -547,48 +1239,40 @@ def check (word1, word2, l1, l2):
     word2 = l2[word2]
     return word1, word2
 
-def one_word2(word, lang):
-    """
-    One word parsing in bidix
-    
-    :param word (ElementTree): one word from bidix
-    :param lang (str): language name
-    """
-    s = word.findall('.//s')
-    s = [i.attrib['n'] for i in s]
-    if word.text: st = str(word.text)
-    else: st = ''
-    s = Tags(s)
-    if '_' in st: st = st.replace('_',' ')
-    return Word(st, lang, s)
-
-def parse_bidix (tree, lang1, lang2):
+def parse_bidix (file, lang1, lang2):
     """
-    Bilingual dictionary parsing. Creates a file that contains all word
-    pairs from original dictionary but in proper form for a future
-    graph.
+    Bilingual dictionary parsing. Streaming reader (iterparse): yields
+    word pairs of section entries as soon as <e> element is closed and
+    removes it from the tree, so memory does not depend on dictionary
+    size. Entries without <l> or <r> are skipped, malformed XML raises
+    ET.ParseError after the entries before it.
     
-    :param tree (etree.ElementTree): etree.ElementTree object from 
-    .dix file
+    :param file (str, file object): .dix file
     :param lang1, lang2 (str): language names
     
-    :yield: words
-    :ytype: Word
-    """
-    all = tree.findall('section')
-    if not all: pass
-    else:
-        for tree in all:
-            for e in tree:
-                if 'r' in e.attrib: side = e.attrib['r']
-                else: side = ''
-                p = e.find('p')
-                if p:
-                    yield one_word2(p.find('l'), lang1), one_word2(p.find('r'), lang2), side
-                else:
-                    i = e.find('i')
-                    if i:
-                        yield one_word2(i, lang1), one_word2(i, lang2), side
+    :yield: word1, word2, side (LR, RL or '')
+    :ytype: Word, Word, str
+    """
+    stack = []
+    for event, elem in ET.iterparse(file, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag != 'e': continue
+        parent = stack[-1] if stack else None
+        if parent is not None and parent.tag == 'section':
+            side = elem.attrib.get('r', '')
+            p = elem.find('p')
+            if p is not None:
+                left, right = p.find('l'), p.find('r')
+                if left is not None and right is not None:
+                    yield one_word(left, lang1), one_word(right, lang2), side
+            else:
+                i = elem.find('i')
+                if i is not None:
+                    yield one_word(i, lang1), one_word(i, lang2), side
+        if parent is not None: parent.remove(elem)
 
 def existance(pair, nodes):
     """Check if language pair links two languages from our list.
@@ -598,7 +1282,44 @@ def existance(pair, nodes):
     if pair[0] in nodes and pair[1] in nodes: return True
     else: return False
 
-def bidix(input):
+def _parse_file(args):
+    """
+    Parsed copy of one bilingual dictionary (worker for bidix).
+    Malformed file gives an empty copy (not the entries before the
+    error).
+    
+    :param args (tuple): file, pair of language names
+    
+    :return: parsed text, counts (both sides, LR, RL), number of word
+    pairs with a word missing in monolingual dictionaries, edges
+    (see write_edges), whether the file was parsed
+    :rtype: str, list, int, list, bool
+    """
+    file, name = args
+    l1 = import_mono(name[0])
+    l2 = import_mono(name[1])
+    copy = []
+    edges = []
+    count = [0,0,0]
+    misses = 0
+    with open (file, 'rb') as d:
+        try:
+            for word1, word2, side in parse_bidix (d, name[0], name[1]):
+                try: word1, word2 = check (word1, word2, l1, l2)
+                except KeyError:
+                    misses += 1
+                    continue
+                if not side: count[0]+=1
+                elif side == 'LR': count[1] += 1
+                elif side == 'RL': count[2] += 1
+                copy.append(str(side) + '\t' + word1.write(mode='bi') + '\t' + word2.write(mode='bi') + '\n')
+                edges.append((l1.position[id(word1)], l2.position[id(word2)], SIDES.get(side, 3)))
+        except ET.ParseError as e:
+            logging.warning('{}: {}, file is skipped'.format(file, e))
+            return '', [0,0,0], 0, [], False
+    return ''.join(copy), count, misses, edges, True
+
+def bidix(input, manifest=None, hashes=None, jobs=1):
     """
     Parsing bilingual dictionaries from file list. Creates all
     preprocessed copies of these dictionaries.
@@ -607,45 +1328,63 @@ def bidix(input):
     2. Creates 'stats' file that will contain information about the
     size of all bilingual dictionaries (this will be used to define
     valuable dictionaries and languages for a graph).
-    3. Converts original dictionary into parsed copy.
+    3. Converts original dictionary into parsed copy (text and binary
+    edges, see write_edges).
     4. Counts both, RL and LR words.
+    
+    With manifest a dictionary is parsed again only if the file itself
+    or one of two monolingual dictionaries changed, counts for stats
+    are taken from manifest. Dictionaries can be parsed in worker
+    processes, files are written here in file list order. Malformed
+    dictionary gets empty outputs and is not recorded in manifest, so
+    it is parsed again next time.
+    
+    :param input (str): file list
+    :param manifest (dict): preprocessing manifest (see preprocessing)
+    :param hashes (dict): content hashes of source files
+    :param jobs (int): number of processes for parsing
     """
     logging.info('Started bilingual dictionaries')
     if not os.path.exists('./parsed/'): os.makedirs('./parsed/')
+    if not os.path.exists(BINARY): os.makedirs(BINARY)
+    if manifest is None: manifest = {}
+    with open(input, 'r', encoding = 'utf-8') as f:
+        lines = f.readlines()
+    items, tasks = [], []
+    for line in lines:
+        file = line.strip('\n')
+        name = [l(i) for i in line.split('.')[-2].split('-')]
+        nm = '-'.join(name)
+        if nm in rename: 
+            name = [i for i in rename[nm].split('-')]
+        key, record = None, None
+        if hashes is not None:
+            key = parsed_key(file, name, manifest, hashes)
+            record = manifest.get('parsed', {}).get(file)
+            if not record or record['key'] != key or not os.path.exists('./parsed/'+'-'.join(name)) or not os.path.exists(BINARY+'-'.join(name)+'.npy'): record = None
+        if not record: tasks.append((file, name))
+        items.append((file, name, key, record))
+    results = _pmap(_parse_file, tasks, jobs)
+    misses = 0
     with open ('./tool/stats.csv','w',encoding='utf-8') as stats:
-        with open(input, 'r', encoding = 'utf-8') as f:
-            lines = f.readlines()
-        for line in tqdm(lines):
-            file = line.strip('\n')
-            name = [l(i) for i in line.split('.')[-2].split('-')]
-            nm = '-'.join(name)
-            if nm in rename: 
-                name = [i for i in rename[nm].split('-')]
-                #l1 = import_mono(name[1])
-                #l2 = import_mono(name[0])
-                #print (name)
-            #else:
-            l1 = import_mono(name[0])
-            l2 = import_mono(name[1])
-            with open (file, 'r', encoding='utf-8') as d:
+        for file, name, key, record in tqdm(items):
+            if record: count = record['count']
+            else:
+                text, count, missing, edges, parsed = next(results)
+                if missing: logging.debug('{}: {} pairs with words missing in monodix'.format('-'.join(name), missing))
+                misses += missing
                 with open ('./parsed/'+'-'.join(name), 'w', encoding='utf-8') as copy:
-                    count = [0,0,0]
-                    try:
-                        tree = ET.fromstring(re.sub('\s{3,}','\t', d.read().replace('<b/>',' ').replace('<.?g>','')))
-                        for word1, word2, side in parse_bidix (tree, name[0], name[1]):
-                            try:
-                                word1, word2 = check (word1, word2, l1, l2)
-                                if not side: count[0]+=1
-                                elif side == 'LR': count[1] += 1
-                                elif side == 'RL': count[2] += 1
-                                string = str(side) + '\t' + word1.write(mode='bi') + '\t' + word2.write(mode='bi') + '\n'
-                                copy.write(string)
-                            except: pass
-                    except: pass
-                    stats.write('\t'.join(name) + '\t'+ '\t'.join(str(i) for i in count)+'\n')
-                    #print ('-'.join(name), end='\t')
+                    copy.write(text)
+                write_edges('-'.join(name), edges)
+                if not parsed:
+                    if manifest.get('parsed', {}).pop(file, None):
+                        save_manifest(manifest, PREPROCESSING_MANIFEST)
+                elif key:
+                    manifest.setdefault('parsed', {})[file] = {'key': key, 'count': count}
+                    save_manifest(manifest, PREPROCESSING_MANIFEST)
+            stats.write('\t'.join(name) + '\t'+ '\t'.join(str(i) for i in count)+'\n')
     print ()
-    logging.info('Finished bilingual dictionaries')
+    logging.info('Finished bilingual dictionaries (unchanged: {}, pairs with missing words: {})'.format(len(items) - len(tasks), misses))
 
 def recommend(lang1, lang2, input):
     """
@@ -678,15 +1417,76 @@ def recommend(lang1, lang2, input):
         for i in sorted(result, key=result.get):
             f.write(i+'\n')
 
-def preprocessing(input='filelist.txt'):
+def source_hashes(input):
+    """
+    Content hashes of all dictionaries in file list
+    
+    :param input (str): file list
+    
+    :return: file name -> sha256
+    :rtype: dict
+    """
+    with open (input, 'r', encoding='utf-8') as f:
+        return {line.strip('\n'): _sha256(line.strip('\n')) for line in f}
+
+def monodix_key(lang, input, hashes):
+    """
+    Key of a monolingual dictionary: hash of all source dictionaries
+    (content hash and side) that contain this language, in file list
+    order (the order affects the result).
+    
+    :param lang (str): language name
+    :param input (str): file list
+    :param hashes (dict): content hashes of source files
+    
+    :rtype: str
+    """
+    sources = [PREPROCESSING_VERSION, lang]
+    with open (input, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip('\n')
+            pair = [l(i) for i in line.split('.')[-2].split('-')]
+            if '-'.join(pair) in rename: pair = rename['-'.join(pair)].split('-')
+            if lang in pair:
+                sources.append((hashes[line], pair.index(lang)))
+    return hashlib.sha256(json.dumps(sources).encode('utf-8')).hexdigest()
+
+def parsed_key(file, name, manifest, hashes):
+    """
+    Key of a parsed bilingual dictionary: content hash of the file and
+    keys of both monolingual dictionaries.
+    
+    :param file (str): source file
+    :param name (list): language names
+    :param manifest (dict): preprocessing manifest
+    :param hashes (dict): content hashes of source files
+    
+    :rtype: str
+    """
+    mono = manifest.get('monodix', {})
+    sources = [PREPROCESSING_VERSION, name, hashes[file], mono.get(name[0]), mono.get(name[1])]
+    return hashlib.sha256(json.dumps(sources).encode('utf-8')).hexdigest()
+
+def preprocessing(input='filelist.txt', force=False, jobs=1):
     """
     Combination of previous functions: all_languages, monodix and bidix
+    
+    Manifest (preprocessing.json) stores hash of source dictionaries
+    for every monolingual and parsed dictionary, so only outputs with
+    changed inputs are rebuilt.
+    
+    :param input (str): file list
+    :param force (bool): ignore manifest and rebuild everything
+    :param jobs (int): number of processes for parsing (output is the
+    same as with one process)
     """
-    all_languages(input)
     global langs
-    from .langs import langs
-    monodix(input)
-    bidix(input)
+    langs = all_languages(input)
+    hashes = source_hashes(input)
+    if force: manifest = {}
+    else: manifest = load_manifest(PREPROCESSING_MANIFEST)
+    monodix(input, manifest=manifest, hashes=hashes, jobs=jobs)
+    bidix(input, manifest=manifest, hashes=hashes, jobs=jobs)
 
 def import_mono(lang):
     """
@@ -699,16 +1499,123 @@ def import_mono(lang):
     :rtype: DiGetItem 
     """
     dictionary = DiGetItem()
+    if os.path.exists(BINARY+lang+'.npy'):
+        for word in mono_words(lang): dictionary.add(word)
+        return dictionary
     with open ('./monodix/{}.dix'.format(lang), 'r', encoding='utf-16') as f:
         for line in f:
             string = line.strip('\n').split('\t')
-            s = [Tags([j for j in i.split('-') if j !='']) for i in string[1].strip().split('$')]
+            s = parse_tags(string[1])
             dictionary.add(Word(string[0], lang, s))
-    dictionary.list.sort(key=str)
     return dictionary
 
+# BINARY STORAGE
+
+def write_mono_binary(lang, words):
+    """
+    Binary copy of monolingual dictionary:
+    
+    - <lang>.str : string table (lemmas and tag variants), one string
+      per line (UTF-8)
+    - <lang>.npy : nodes, int32 array (n, 2) - lemma and tags string
+      numbers. Node number is the position in this array.
+    
+    :param lang (str): language name
+    :param words (list): words in order of monodix
+    """
+    strings, numbers, nodes = [], {}, []
+    for word in words:
+        row = []
+        for field in (word.lemma, '$'.join([str(i) for i in word.s])):
+            if field not in numbers:
+                numbers[field] = len(strings)
+                strings.append(field)
+            row.append(numbers[field])
+        nodes.append(row)
+    with open (BINARY+lang+'.str', 'w', encoding='utf-8', newline='\n') as f:
+        f.write('\n'.join(strings))
+    np.save(BINARY+lang+'.npy', np.array(nodes, dtype=np.int32).reshape(-1, 2))
+
+def write_edges(pair, edges):
+    """
+    Binary copy of parsed bilingual dictionary: <pair>.npy, structured
+    array with fields l, r (node numbers in binary monolingual
+    dictionaries) and side (0 - both, 1 - LR, 2 - RL, 3 - other).
+    
+    :param pair (str): pair name (lang1-lang2)
+    :param edges (list): (l, r, side) tuples
+    """
+    np.save(BINARY+pair+'.npy', np.array(edges, dtype=EDGE_TYPE))
+
+def read_mono(lang):
+    """
+    Reads binary monolingual dictionary. Nodes are memory-mapped.
+    
+    :param lang (str): language name
+    
+    :return: string table, nodes
+    :rtype: list, numpy.ndarray
+    """
+    with open (BINARY+lang+'.str', 'r', encoding='utf-8', newline='\n') as f:
+        strings = f.read().split('\n')
+    return strings, np.load(BINARY+lang+'.npy', mmap_mode='r')
+
+def read_edges(pair):
+    """
+    Reads binary parsed dictionary (memory-mapped, see write_edges)
+    
+    :param pair (str): pair name (lang1-lang2)
+    
+    :rtype: numpy.ndarray
+    """
+    return np.load(BINARY+pair+'.npy', mmap_mode='r')
+
+def mono_words(lang, numbers=None):
+    """
+    Word objects from binary monolingual dictionary. Tag variants are
+    parsed once for each distinct string.
+    
+    :param lang (str): language name
+    :param numbers (array): node numbers (None for all nodes)
+    
+    :return: words (in order of numbers)
+    :rtype: list
+    """
+    strings, nodes = read_mono(lang)
+    if numbers is not None: nodes = nodes[numbers]
+    variants = {}
+    words = []
+    for lemma, tags in nodes.tolist():
+        if tags not in variants:
+            variants[tags] = parse_tags(strings[tags])
+        words.append(Word(strings[lemma], lang, variants[tags]))
+    return words
+
 # BUILDING
 
+LANGUAGE_STATS = {} # stats.csv modification time -> graph of languages
+
+def language_stats():
+    """
+    Graph of languages from './tool/stats.csv' (see
+    get_relevant_languages). It is read once and kept until the file
+    changes, so configuration files for many pairs don't read it again.
+    
+    :rtype: NetworkX.Graph
+    """
+    mtime = os.stat('./tool/stats.csv').st_mtime_ns
+    if mtime not in LANGUAGE_STATS:
+        G = nx.Graph()
+        with open ('./tool/stats.csv', 'r', encoding='utf-8') as f:
+            for line in f:
+                data = line.split('\t')
+                coef = 1/log10(10+float(data[2])+0.5*float(data[3])+0.5*float(data[4]))
+                if coef < 1:
+                    G.add_edge(data[0], data[1], weight=coef)
+        LANGUAGE_STATS.clear()
+        LANGUAGE_STATS[mtime] = G
+    return LANGUAGE_STATS[mtime]
+
 def get_relevant_languages(lang1, lang2):
     """
     Recommendations for choosing best languages to include in graph.
@@ -746,13 +1653,7 @@ def get_relevant_languages(lang1, lang2):
     :param lang1, lang2 (str): language names
     """
 
-    G = nx.Graph()
-    with open ('./tool/stats.csv', 'r', encoding='utf-8') as f:
-        for line in f:
-            data = line.split('\t')
-            coef = 1/log10(10+float(data[2])+0.5*float(data[3])+0.5*float(data[4]))
-            if coef < 1:
-                G.add_edge(data[0], data[1], weight=coef)
+    G = language_stats()
     result = {}
     for path in islice(nx.shortest_simple_paths(G, source=lang1, target=lang2, weight='weight'), 0, 300):
         length = sum([G[path[i]][path[i-1]]['weight'] for i in range(1, len(path))])
@@ -764,55 +1665,138 @@ def get_relevant_languages(lang1, lang2):
         for i in sorted(result, key=result.get):
             f.write(str(result[i][0])+'\t'+str(i)+'\t:\t'+' '.join(result[i][1])+'\n')
 
-def load_file(lang1, lang2, n=10):
+def graph_languages(lang1, lang2, n=10):
     """
-    It takes top-N languages from configuration file and merges
-    bilingual dictionaries (preprocessed) with both languages in short
-    list (configuration file).
+    Top-N languages from configuration file (created if there is no
+    such file) and both languages of the pair.
     
     :param lang1, lang2 (str): languge names
     :param n (int): number of languages we want to use in graph
+    
+    :return: languages
+    :rtype: set
     """
-    with open ('{}-{}-config'.format(lang1, lang2),'r',encoding='utf-8') as f:
+    config = '{}-{}-config'.format(lang1, lang2)
+    if not os.path.exists(config): get_relevant_languages(lang1, lang2)
+    with open (config,'r',encoding='utf-8') as f:
         languages = set([i.split('\t')[1].strip() for i in islice(f.readlines(), 0, n)])
-    languages = languages | set([lang1,lang2])
-    file = '{}-{}'.format(lang1, lang2)
-    with open (file, 'w', encoding='utf-16') as f:
-        for root, dirs, files in os.walk ('./parsed/'):
-            for fl in files:
-                pair = fl.replace('.dix','').split('-')
-                if existance(pair, languages):
-                    #print (pair)
-                    with open (root+fl, 'r', encoding='utf-8') as d:
-                        f.write(d.read())
-    with open(file, 'r', encoding='utf-16') as f:
-        text = f.read()
-    text = text.encode('utf-8')
-    text = text.decode('utf-8')
-    with open(file, 'w', encoding='utf-8') as f:
-        f.write(text)
-
-def parse_line(line):
+    return languages | set([lang1,lang2])
+
+def shards(languages):
     """
-    It parses line in loading file (with edges) and returns side (LR,
-    RL, both) and two Word objects.
+    Parsed dictionaries (file names in './parsed/') with both
+    languages in the set.
     
-    :param line (str): line in a loading file (translation, pair of
-    words)
+    :param languages (set): languages
     
-    :return: side, word1, word2
-    :rtype: str, Word, Word
+    :yield: file name, pair
+    :ytype: str, list
     """
-    side, lang1, lemma1, tags1, lang2, lemma2, tags2 = line.strip('\n').split('\t')
-    tags1 = [Tags(i.split('-')) for i in tags1.split('$')]
-    tags2 = [Tags(i.split('-')) for i in tags2.split('$')]
-    return side, Word(lemma1, lang1, tags1), Word(lemma2, lang2, tags2)
+    for root, dirs, files in os.walk ('./parsed/'):
+        for fl in files:
+            pair = fl.replace('.dix','').split('-')
+            if existance(pair, languages): yield root+fl, pair
 
-def built_from_file(file):
+def load_file(lang1, lang2, n=10):
     """
-    This function returns a graph based on loading file (this graph
-    will be used in further ditionary enrichment)
-    
+    It takes top-N languages from configuration file and merges
+    bilingual dictionaries (preprocessed) with both languages in short
+    list (configuration file).
+    
+    Graph is built directly from parsed dictionaries (see load_graph),
+    this file is only an export.
+    
+    :param lang1, lang2 (str): languge names
+    :param n (int): number of languages we want to use in graph
+    """
+    languages = graph_languages(lang1, lang2, n=n)
+    with open ('{}-{}'.format(lang1, lang2), 'wb') as f:
+        for fl, pair in shards(languages):
+            with open (fl, 'rb') as d:
+                shutil.copyfileobj(d, f)
+
+def parse_tags(field):
+    """
+    Tag variants from a field of monodix, binary string table or
+    parsed file (variants separated by '$', tags by '-'). Empty tags
+    are dropped, so an untagged word is the same in all of them.
+    
+    :param field (str): tags field
+    
+    :return: tag variants
+    :rtype: list
+    """
+    return [Tags([j for j in i.split('-') if j != '']) for i in field.strip().split('$')]
+
+def parse_word(lang, lemma, tags, table=None):
+    """
+    Word from fields of a parsed file (tags parsed by parse_tags).
+    With interning table there is only one object for each distinct
+    word.
+    
+    :param lang, lemma, tags (str): fields
+    :param table (dict): interning table
+    
+    :return: word
+    :rtype: Word
+    """
+    if table is None: return Word(lemma, lang, parse_tags(tags))
+    key = (lang, lemma, tags)
+    word = table.get(key)
+    if word is None:
+        word = table[key] = Word(lemma, lang, parse_tags(tags))
+    return word
+
+def parse_line(line, table=None):
+    """
+    It parses line in loading file (with edges) and returns side (LR,
+    RL, both) and two Word objects.
+    
+    :param line (str): line in a loading file (translation, pair of
+    words)
+    :param table (dict): interning table (see parse_word)
+    
+    :return: side, word1, word2
+    :rtype: str, Word, Word
+    """
+    side, lang1, lemma1, tags1, lang2, lemma2, tags2 = line.strip('\n').split('\t')
+    return side, parse_word(lang1, lemma1, tags1, table), parse_word(lang2, lemma2, tags2, table)
+
+def line_edges(lines, table=None):
+    """
+    Edges from lines of a loading (or parsed) file: both sides - two
+    edges, LR and RL - one edge.
+    
+    :param lines (iterable): lines
+    :param table (dict): interning table (see parse_word)
+    
+    :yield: edges
+    :ytype: Word, Word
+    """
+    for line in lines:
+        side, word1, word2 = parse_line(line, table)
+        if not side:
+            yield word1, word2
+            yield word2, word1
+        elif side == 'LR': yield word1, word2
+        elif side == 'RL': yield word2, word1
+        else: pass #print (side)
+
+def add_lines(G, lines, table=None):
+    """
+    Adds edges from lines of a loading (or parsed) file to graph.
+    
+    :param G (NetworkX.DiGraph): graph
+    :param lines (iterable): lines
+    :param table (dict): interning table (see parse_word)
+    """
+    G.add_edges_from(line_edges(lines, table))
+
+def built_from_file(file):
+    """
+    This function returns a graph based on loading file (this graph
+    will be used in further ditionary enrichment)
+    
     :param file (str): filename
     
     :return: result graph with all words
@@ -820,16 +1804,285 @@ def built_from_file(file):
     """
     G = nx.DiGraph()
     with open(file, 'r', encoding='utf-8') as f:
-        for line in f:
-            side, word1, word2 = parse_line(line)
-            if not side:
-                G.add_edge(word1, word2)
-                G.add_edge(word2, word1)
-            elif side == 'LR': G.add_edge(word1, word2)
-            elif side == 'RL': G.add_edge(word2, word1)
-            else: pass #print (side)
+        add_lines(G, f, {})
+    return G
+
+def built_from_parsed(languages):
+    """
+    Same graph as built_from_file for loading file with these
+    languages, but edges are read line by line straight from parsed
+    dictionaries (no loading file).
+    
+    :param languages (set): languages
+    
+    :return: result graph with all words
+    :rtype: NetworkX.DiGraph
+    """
+    G = nx.DiGraph()
+    table = {}
+    for fl, pair in shards(languages):
+        with open(fl, 'r', encoding='utf-8') as f:
+            add_lines(G, f, table)
+    return G
+
+def csr_from_parsed(languages):
+    """
+    Same as built_from_parsed, but returns CSRGraph.
+    
+    :param languages (set): languages
+    
+    :rtype: CSRGraph
+    """
+    table, numbers, words, src, dst = {}, {}, [], [], []
+    for fl, pair in shards(languages):
+        with open(fl, 'r', encoding='utf-8') as f:
+            for u, v in line_edges(f, table):
+                for word, side in ((u, src), (v, dst)):
+                    if word not in numbers:
+                        numbers[word] = len(words)
+                        words.append(word)
+                    side.append(numbers[word])
+    objects = np.empty(len(words), dtype=object)
+    objects[:] = words
+    return CSRGraph.from_edges(src, dst, objects)
+
+def load_graph(lang1, lang2, n=10, engine='networkx', cache=True):
+    """
+    Graph for a language pair: top-N languages from configuration file,
+    edges from binary storage (built_from_store) or, if preprocessing
+    didn't create it, from parsed text files (built_from_parsed).
+    
+    A built graph is saved as a snapshot (see write_snapshot) and next
+    time it is read from the snapshot if inputs didn't change.
+    
+    :param lang1, lang2 (str): languge names
+    :param n (int): number of languages we want to use in graph
+    :param engine (str): 'networkx' (NetworkX.DiGraph) or 'csr'
+    (CSRGraph)
+    :param cache (bool): use graph snapshots
+    
+    :return: result graph with all words
+    :rtype: NetworkX.DiGraph, CSRGraph
+    """
+    return languages_graph(graph_languages(lang1, lang2, n=n), engine=engine, cache=cache)
+
+def languages_graph(languages, engine='networkx', cache=True):
+    """
+    Graph of all dictionaries with both languages in the set, read from
+    snapshot or built (see load_graph).
+    
+    :param languages (set): languages
+    :param engine (str): 'networkx' or 'csr'
+    :param cache (bool): use graph snapshots
+    
+    :rtype: NetworkX.DiGraph, CSRGraph
+    """
+    if not cache: return build_graph(languages, engine)
+    key = graph_key(languages, engine)
+    G = read_snapshot(key)
+    if G is None:
+        G = build_graph(languages, engine)
+        write_snapshot(key, G, languages)
+    return G
+
+def build_graph(languages, engine='networkx'):
+    """
+    Builds graph from binary storage if there is a binary copy of every
+    parsed dictionary, otherwise from parsed text files.
+    
+    :param languages (set): languages
+    :param engine (str): 'networkx' or 'csr'
+    
+    :rtype: NetworkX.DiGraph, CSRGraph
+    """
+    binary = all(os.path.exists(BINARY+'-'.join(pair)+'.npy') for fl, pair in shards(languages))
+    if engine == 'csr':
+        if binary: return CSRGraph.from_edges(*store_edges(languages))
+        return csr_from_parsed(languages)
+    if binary: G = built_from_store(languages)
+    else: G = built_from_parsed(languages)
+    index_languages(G)
+    return G
+
+def index_languages(G):
+    """
+    Per-language neighbour index of NetworkX graph:
+    G.graph['lang_index'][node][lang] - successors of node in this
+    language (in order of G.neighbors). CSRGraph has its own index.
+    The index is not updated if edges are removed later.
+    
+    :param G (NetworkX.DiGraph): graph
+    """
+    index = {}
+    for node, neighbors in G.adj.items():
+        langs = {}
+        for word in neighbors: langs.setdefault(word.lang, []).append(word)
+        index[node] = langs
+    G.graph['lang_index'] = index
+
+def lang_neighbors(G, node, lang):
+    """
+    Successors of node in one language. Uses per-language index (see
+    index_languages), so checking whether a word already has a
+    translation doesn't scan all its neighbours. The list must not be
+    changed.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param node (Word): node
+    :param lang (str): language
+    
+    :rtype: list
+    """
+    if isinstance(G, CSRGraph): return G.lang_neighbors(node, lang)
+    if 'lang_index' in G.graph: return G.graph['lang_index'][node].get(lang, [])
+    return FilteredList(G.neighbors(node)).lang(lang)
+
+def store_edges(languages):
+    """
+    Edges of all pairs of languages from the set in binary storage (see
+    write_edges) in the same order as in loading file. Nodes of all
+    languages get one numbering, only used nodes become Word objects.
+    
+    :param languages (set): languages
+    
+    :return: source and target node numbers, words (Word for every used
+    node number)
+    :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+    """
+    pairs = []
+    for fl, pair in shards(languages):
+        if os.path.exists(BINARY+'-'.join(pair)+'.npy'):
+            pairs.append((pair, read_edges('-'.join(pair))))
+    offsets, used, size = {}, {}, 0
+    for pair, edges in pairs:
+        for lang, side in zip(pair, 'lr'):
+            if lang not in offsets:
+                offsets[lang] = size
+                size += len(read_mono(lang)[1])
+            used.setdefault(lang, []).append(edges[side])
+    words = np.empty(size, dtype=object)
+    for lang in used:
+        numbers = np.unique(np.concatenate(used[lang]))
+        words[numbers + offsets[lang]] = mono_words(lang, numbers)
+    sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for pair, edges in pairs:
+        u = edges['l'].astype(np.int64) + offsets[pair[0]]
+        v = edges['r'].astype(np.int64) + offsets[pair[1]]
+        side = np.asarray(edges['side'])
+        # every line gives one or two edges, keep order of lines
+        src = np.stack([np.where(side == 2, v, u), v], axis=1).ravel()
+        dst = np.stack([np.where(side == 2, u, v), u], axis=1).ravel()
+        valid = np.stack([side < 3, side == 0], axis=1).ravel()
+        sources.append(src[valid])
+        targets.append(dst[valid])
+    return np.concatenate(sources), np.concatenate(targets), words
+
+def built_from_store(languages):
+    """
+    This function returns a graph built from binary storage (see
+    write_edges) for all pairs of languages from the set. No text
+    parsing: edges are read as arrays and only used nodes become Word
+    objects. Edges are added in the same order as in loading file.
+    
+    :param languages (set): languages
+    
+    :return: result graph with all words
+    :rtype: NetworkX.DiGraph
+    """
+    src, dst, words = store_edges(languages)
+    G = nx.DiGraph()
+    G.add_edges_from(zip(words[src], words[dst]))
+    return G
+
+# GRAPH SNAPSHOTS
+
+def graph_key(languages, engine='networkx'):
+    """
+    Key of a graph snapshot: hash of the language set, engine and all
+    inputs of build_graph (parsed and binary dictionaries: name, size,
+    modification time). Preprocessing rewrites only changed outputs, so
+    unchanged dictionaries keep their key.
+    
+    :param languages (set): languages
+    :param engine (str): graph engine
+    
+    :rtype: str
+    """
+    files = []
+    for fl, pair in sorted(shards(languages)):
+        files.append(fl)
+        files.append(BINARY+'-'.join(pair)+'.npy')
+        for lang in pair: files.extend([BINARY+lang+'.npy', BINARY+lang+'.str'])
+    sources = [PREPROCESSING_VERSION, GRAPH_VERSION, engine, sorted(languages)]
+    for fl in sorted(set(files)):
+        if os.path.exists(fl):
+            stat = os.stat(fl)
+            sources.append((fl, stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(json.dumps(sources).encode('utf-8')).hexdigest()
+
+def read_snapshot(key):
+    """
+    Reads graph snapshot (None if there is no snapshot with this key or
+    it can't be read, see load_pickle). Reading marks the snapshot as
+    recently used.
+    
+    :param key (str): graph key (see graph_key)
+    
+    :rtype: NetworkX.DiGraph, CSRGraph, None
+    """
+    G = load_pickle(GRAPHS, key)
+    if G is not None: logging.info('graph snapshot '+key[:12])
     return G
 
+def write_snapshot(key, G, languages, limit=None):
+    """
+    Saves graph snapshot (pickle, written atomically) and removes least
+    recently used snapshots (see evict_snapshots).
+    
+    :param key (str): graph key (see graph_key)
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param languages (set): languages (for manifest)
+    :param limit (int): size limit for all snapshots in bytes (None -
+    GRAPH_CACHE_SIZE)
+    """
+    os.makedirs(GRAPHS, exist_ok=True)
+    filename = GRAPHS+key+'.pickle'
+    dump_pickle(G, filename)
+    with locked_manifest(GRAPHS+'manifest.json') as manifest:
+        manifest[key] = {'languages': sorted(languages), 'size': os.path.getsize(filename), 'used': time.time()}
+        evict_snapshots(manifest, key, limit)
+
+def evict_snapshots(manifest, keep=None, limit=None):
+    """
+    Removes least recently used snapshots until all snapshots together
+    are not bigger than limit. Snapshot keep is never removed.
+    
+    :param manifest (dict): snapshot manifest (changed in place)
+    :param keep (str): key of snapshot to keep
+    :param limit (int): size limit in bytes (None - GRAPH_CACHE_SIZE)
+    """
+    if limit is None: limit = GRAPH_CACHE_SIZE
+    evict_files(manifest, GRAPHS, keep, limit)
+
+def evict_files(manifest, path, keep, limit):
+    """
+    Removes least recently used files (<path><key>.pickle) of a cache
+    with manifest until all of them together are not bigger than
+    limit (see evict_snapshots, evict_results).
+    
+    :param manifest (dict): manifest (changed in place)
+    :param path (str): cache directory
+    :param keep (str): key to keep
+    :param limit (int): size limit in bytes
+    """
+    total = sum(i['size'] for i in manifest.values())
+    for key in sorted(manifest, key=lambda x: manifest[x]['used']):
+        if total <= limit: break
+        if key == keep: continue
+        total -= manifest[key]['size']
+        del manifest[key]
+        if os.path.exists(path+key+'.pickle'): os.remove(path+key+'.pickle')
+
 def dictionaries(lang1, lang2):
     """
     Returns two dictionaries (from pair we want to enrich) as
@@ -841,11 +2094,18 @@ def dictionaries(lang1, lang2):
     :return: dictionaries
     :rtype: SetWithFilter
     """
-    l1 = import_mono(lang1)
-    l2 = import_mono(lang2)
-    l1 = SetWithFilter(l1.list+list(l1.dict.keys()))
-    l2 = SetWithFilter(l2.list+list(l2.dict.keys()))
-    return l1, l2
+    return dictionary(lang1), dictionary(lang2)
+
+def dictionary(lang):
+    """
+    One dictionary (see dictionaries).
+    
+    :param lang (str): language name
+    
+    :rtype: SetWithFilter
+    """
+    words = import_mono(lang)
+    return SetWithFilter(words.list+list(words.dict.keys()))
 
 def check_graph(lang1, lang2, n=10):
     """
@@ -855,43 +2115,195 @@ def check_graph(lang1, lang2, n=10):
     :param lang1, lang2 (str): language names
     :param n (int): number of languages we eant to use in graph
     """
-    G = nx.Graph()
-    with open ('./tool/stats.csv', 'r', encoding='utf-8') as f:
-        for line in f:
-            data = line.split('\t')
-            coef = 1/log10(10+float(data[2])+0.5*float(data[3])+0.5*float(data[4]))
-            if coef < 1:
-                G.add_edge(data[0], data[1], weight=coef)
-    with open ('{}-{}-config'.format(lang1, lang2),'r',encoding='utf-8') as f:
-        languages = set([i.split('\t')[1].strip() for i in islice(f.readlines(), 0, n)])
-    languages = languages | set([lang1,lang2])
+    G = language_stats()
+    languages = graph_languages(lang1, lang2, n=n)
     nx.draw_shell(G.subgraph(languages), with_labels = True, font_size = 20, node_color = 'white')
 
 # SEARCH
 
-def metric(G, word, translation, cutoff, mode='exp'):
+SEARCH_CACHE = LRUCache(100000)
+VERSIONS = count(1)
+
+def graph_version(G):
+    """
+    Version of graph for search cache keys: a number unique in this
+    process, given to graph on first search. CSRGraph.remove_edge
+    drops it (a new one is given), NetworkX graphs must not be changed
+    after search (or G.graph['version'] has to be removed).
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    
+    :rtype: int
+    """
+    if 'version' not in G.graph: G.graph['version'] = next(VERSIONS)
+    return G.graph['version']
+
+def _cache_key(G, kind, node, other, cutoff, exclude):
+    """Key of search cache: exclude is a part of the key"""
+    return (kind, graph_version(G), node, other, cutoff, frozenset(exclude) if exclude else None)
+
+def count_paths(successors, predecessors, source, targets, cutoff):
+    """
+    Number of simple paths from source to every target with at most
+    cutoff edges by length (number of nodes in path) without building
+    paths. Same counts and same order of lengths (order of first path
+    with this length in NetworkX.all_simple_paths) as
+    Counter(len(i) for i in nx.all_simple_paths(G, source, target, cutoff)),
+    so coefficients (see metric) are the same.
+    
+    All targets are counted in one pass: neighbours of visited nodes
+    are read once and the neighbourhood of source is shared.
+    
+    Cutoff <= 4: meet in the middle - paths are joined from two-step
+    neighbourhoods of source and target, then a depth-first search
+    finds the order of lengths (it stops when all lengths are found and
+    skips branches that can't give a new length). Bigger cutoff: one
+    depth-first search that only keeps counts for all targets.
+    
+    :param successors, predecessors (function): node -> list of nodes
+    (successors in order of graph)
+    :param source: node
+    :param targets (list): nodes
+    :param cutoff (int): cutoff
+    
+    :return: Counter for every target
+    :rtype: list
+    """
+    cache, rcache = {}, {}
+    def succ(node):
+        if node not in cache: cache[node] = successors(node)
+        return cache[node]
+    def pred(node):
+        if node not in rcache: rcache[node] = predecessors(node)
+        return rcache[node]
+    if cutoff < 1: return [Counter({1: 1}) if i == source else Counter() for i in targets]
+    if cutoff > 4:
+        # targets are not closed: a path to one target can go through another
+        counts, visited = {i: Counter() for i in targets}, set([source])
+        def dfs(node, depth):
+            for child in succ(node):
+                if child in visited: continue
+                if child in counts: counts[child][depth+2] += 1
+                if depth + 1 < cutoff:
+                    visited.add(child)
+                    dfs(child, depth + 1)
+                    visited.discard(child)
+        dfs(source, 0)
+        return [Counter({1: 1}) if i == source else counts[i] for i in targets]
+    first = succ(source)
+    base = [a for a in first if a != source]
+    if cutoff >= 4: before = Counter(b for a in base for b in succ(a) if b != source and b != a)
+    results = []
+    for target in targets:
+        if target == source:
+            results.append(Counter({1: 1}))
+            continue
+        mids = [a for a in base if a != target]
+        into = set(i for i in pred(target) if i != target)
+        totals = {2: int(target in first)}
+        if cutoff >= 2: totals[3] = sum(1 for a in mids if a in into)
+        if cutoff >= 3:
+            totals[4] = sum(1 for a in mids for b in succ(a) if b != source and b != target and b != a and b in into)
+        if cutoff >= 4:
+            after = Counter(b for c in into if c != source for b in pred(c) if b != source and b != target and b != c)
+            total = sum(before[b] * after[b] for b in after if b in before)
+            # before also has paths through target
+            if target in base: total -= sum(after[b] for b in succ(target) if b != source and b != target)
+            for a in mids:
+                if a in into:
+                    total -= sum(1 for b in succ(a) if b != source and b != target and b != a and a in succ(b))
+            totals[5] = total
+        present = set(i for i in totals if totals[i])
+        order, visited = [], set([source])
+        def dfs(node, depth):
+            for child in succ(node):
+                if len(order) == len(present): return
+                if child in visited: continue
+                if child == target:
+                    if depth + 2 not in order: order.append(depth + 2)
+                elif depth + 1 < cutoff and any(i in present and i not in order for i in range(depth + 3, cutoff + 2)):
+                    visited.add(child)
+                    dfs(child, depth + 1)
+                    visited.discard(child)
+        dfs(source, 0)
+        results.append(Counter(dict((i, totals[i]) for i in order)))
+    return results
+
+def path_counts(G, word, translations, cutoff, exclude=None):
+    """
+    Paths between word and every translation by length (see
+    count_paths), one pass for all translations that are not in
+    SEARCH_CACHE.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param word (Word): node in graph (word)
+    :param translations (list): translation variants
+    :param cutoff (int): cutoff in graph
+    :param exclude (set): edges (pairs of words) that paths can't use
+    
+    :return: Counter for every translation
+    :rtype: list
+    """
+    keys = [_cache_key(G, 'paths', word, i, cutoff, exclude) for i in translations]
+    result = [SEARCH_CACHE.get(i) for i in keys]
+    missing = [i for i, counts in zip(translations, result) if counts is None]
+    if missing:
+        if isinstance(G, CSRGraph): found = iter(G.path_lengths(word, missing, cutoff, exclude=exclude))
+        else:
+            hidden = exclude or ()
+            successors = lambda x: [i for i in G.adj[x] if (x, i) not in hidden]
+            predecessors = lambda x: [i for i in G.pred[x] if (i, x) not in hidden]
+            found = iter(count_paths(successors, predecessors, word, missing, cutoff))
+        for i, key in enumerate(keys):
+            if result[i] is None:
+                result[i] = next(found)
+                SEARCH_CACHE.put(key, result[i])
+    return result
+
+def metrics(G, word, translations, cutoff, mode='exp', exclude=None):
+    """
+    Coefficients (see metric) of all translations from one traversal.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param word (Word): node in graph (word)
+    :param translations (list): translation variants
+    :param cutoff (int): cutoff in graph
+    :param exclude (set): edges (pairs of words) that paths can't use
+    
+    :return: coefficients
+    :rtype: list
+    """
+    result = []
+    if mode == 'exp':
+        for t in path_counts(G, word, translations, cutoff, exclude=exclude):
+            coef = 0
+            for i in t: 
+                coef += exp(-i)*t[i]
+            result.append(coef)
+        return result
+
+def metric(G, word, translation, cutoff, mode='exp', exclude=None):
     """
     Evaluates translation (word+translation).
     
     coefficient = sum(exp^(-i)), i - length of path from all simple
-    paths between word and translation with set cutoff.
+    paths between word and translation with set cutoff. Paths are
+    counted by count_paths, not enumerated (metrics - for a list of
+    translations).
     
-    :param G (NetworkX.DiGraph): graph
+    :param G (NetworkX.DiGraph, CSRGraph): graph
     :param word (Word): node in graph (word)
     :param translation (Word): one translation variant
     :param cutoff (int): cutoff in graph
+    :param exclude (set): edges (pairs of words) that paths can't use
     
     :return: coefficient
     :rtype: float
     """
-    coef = 0
     if mode == 'exp':
-        t = Counter([len(i) for i in nx.all_simple_paths(G, word, translation, cutoff=cutoff)])
-        for i in t: 
-            coef += exp(-i)*t[i]
-        return coef
+        return metrics(G, word, [translation], cutoff, mode=mode, exclude=exclude)[0]
 
-def _single_shortest_path_length(adj, firstlevel, cutoff, lang):
+def _single_shortest_path_length(adj, firstlevel, cutoff, lang, exclude=None):
     """
     Variant of NetworkX function _single_shortest_path_length
     
@@ -905,6 +2317,7 @@ def _single_shortest_path_length(adj, firstlevel, cutoff, lang):
     :param firstlevel (dict): starting nodes
     :param cutoff (int): cutoff
     :param lang (str): target language
+    :param exclude (set): edges (pairs of words) hidden for this search
     
     :return: list of candidates
     :rtype: list
@@ -920,28 +2333,174 @@ def _single_shortest_path_length(adj, firstlevel, cutoff, lang):
             if v not in seen:
                 seen[v] = level  # set the level of vertex v
                 if v.lang == lang: result.append(v)
+                elif exclude: nextlevel.update((u, adj[v][u]) for u in adj[v] if (v, u) not in exclude)
                 else: nextlevel.update(adj[v])
         level += 1
     return result
 
-def possible_translations(G, source, lang, cutoff=4):
+def bidirectional_candidates(adj, index, source, cutoff, lang, exclude=None):
     """
-    Wrapper for previous _single_shortest_path_length function
+    Same candidates (and order) as _single_shortest_path_length with
+    less work on the last two levels:
     
-    :param G (NetworkX.DiGraph): graph
+    - nodes of the last level (cutoff) are only checked, not expanded
+    - the last level is collected from the target side: target
+      language nodes adjacent to nodes of the previous level (pivots)
+      are read from per-language neighbour index, other neighbours of
+      pivots are never visited
+    
+    :param adj : special NetworkX type of graph representation
+    :param index (function): node -> its neighbours in target language
+    (see lang_neighbors)
+    :param source (Word): node (word)
+    :param cutoff (int): cutoff
+    :param lang (str): target language
+    :param exclude (set): edges (pairs of words) hidden for this search
+    
+    :return: list of candidates
+    :rtype: list
+    """
+    exclude = exclude or ()
+    seen = set()
+    level = 0
+    nextlevel = {source: 0}
+    result = []
+    while nextlevel and cutoff >= level and len(result) < 10:
+        thislevel = nextlevel
+        nextlevel = {}
+        for v in thislevel:
+            if v not in seen:
+                seen.add(v)
+                if v.lang == lang: result.append(v)
+                elif level >= cutoff: continue
+                elif level + 1 >= cutoff: nextlevel.update((u, 0) for u in index(v) if (v, u) not in exclude)
+                elif exclude: nextlevel.update((u, 0) for u in adj[v] if (v, u) not in exclude)
+                else: nextlevel.update(adj[v])
+        level += 1
+    return result
+
+def possible_translations(G, source, lang, cutoff=4, exclude=None, search='bidirectional'):
+    """
+    Wrapper for bidirectional_candidates (search='bidirectional') and
+    previous _single_shortest_path_length function (search='forward'),
+    results are the same. CSRGraph.candidates for CSRGraph. Results
+    are kept in SEARCH_CACHE.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
     :param source (Word): node (word)
     :param cutoff (int): cutoff
     :param lang (str): target language
+    :param exclude (set): edges (pairs of words) hidden for this search
+    (graph is not changed)
+    :param search (str): 'bidirectional' or 'forward'
     
     :return: list of candidates
     :rtype: list
     """
     if source not in G: raise nx.NodeNotFound('Source {} is not in G'.format(source))
     if cutoff is None: cutoff = float('inf')
-    nextlevel = {source: 0}
-    return _single_shortest_path_length(G.adj, nextlevel, cutoff, lang)
+    key = _cache_key(G, 'candidates', source, lang, cutoff, exclude)
+    result = SEARCH_CACHE.get(key)
+    if result is not None: return list(result)
+    if isinstance(G, CSRGraph): result = G.candidates(source, lang, cutoff, exclude=exclude)
+    elif search == 'bidirectional':
+        result = bidirectional_candidates(G.adj, lambda x: lang_neighbors(G, x, lang), source, cutoff, lang, exclude=exclude)
+    else: result = _single_shortest_path_length(G.adj, {source: 0}, cutoff, lang, exclude=exclude)
+    SEARCH_CACHE.put(key, tuple(result))
+    return result
+
+def multi_target_candidates(neighbors, index, source, cutoff, langs, exclude=None):
+    """
+    Candidates for several target languages from one traversal: for
+    every language the same candidates (and order) as
+    bidirectional_candidates.
+    
+    BFS for one language stops in nodes of this language, so levels
+    are kept for every language separately (node is expanded once for
+    all languages that reach it at this level). Order of the next
+    level for language is order of first appearance in neighbours of
+    its nodes: (position of parent in the level, position in
+    neighbours of parent).
+    
+    :param neighbors (function): node -> its neighbours
+    :param index (function): node, language -> its neighbours in this
+    language (see lang_neighbors)
+    :param source (Word): node (word)
+    :param cutoff (int): cutoff
+    :param langs (list): target languages
+    :param exclude (set): edges (pairs of words) hidden for this search
+    
+    :return: language -> list of candidates
+    :rtype: dict
+    """
+    exclude = exclude or ()
+    results = {lang: [] for lang in langs}
+    seen = {lang: set() for lang in langs}
+    thislevel = {lang: [source] for lang in langs}
+    level = 0
+    while cutoff >= level:
+        active = [lang for lang in langs if thislevel[lang] and len(results[lang]) < 10]
+        if not active: break
+        expand = {}
+        for lang in active:
+            for rank, v in enumerate(thislevel[lang]):
+                if v in seen[lang]: continue
+                seen[lang].add(v)
+                if v.lang == lang: results[lang].append(v)
+                elif level < cutoff: expand.setdefault(v, []).append((lang, rank))
+        nextlevel = {lang: {} for lang in active}
+        for v, targets in expand.items():
+            if level + 1 >= cutoff:
+                # last level: only nodes in target language are checked
+                for lang, rank in targets:
+                    found, skip = nextlevel[lang], seen[lang]
+                    for i, u in enumerate(index(v, lang)):
+                        if u in skip or (v, u) in exclude: continue
+                        if u not in found or (rank, i) < found[u]: found[u] = (rank, i)
+                continue
+            for i, u in enumerate(neighbors(v)):
+                if (v, u) in exclude: continue
+                for lang, rank in targets:
+                    if u in seen[lang]: continue
+                    found = nextlevel[lang]
+                    if u not in found or (rank, i) < found[u]: found[u] = (rank, i)
+        for lang in active: thislevel[lang] = sorted(nextlevel[lang], key=nextlevel[lang].get)
+        level += 1
+    return results
+
+def possible_translations_multi(G, source, langs, cutoff=4, exclude=None):
+    """
+    possible_translations for several target languages from one
+    traversal (see multi_target_candidates). Results are kept in
+    SEARCH_CACHE with the same keys as results of
+    possible_translations.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param source (Word): node (word)
+    :param langs (list): target languages
+    :param cutoff (int): cutoff
+    :param exclude (set): edges (pairs of words) hidden for this search
+    
+    :return: language -> list of candidates
+    :rtype: dict
+    """
+    if source not in G: raise nx.NodeNotFound('Source {} is not in G'.format(source))
+    if cutoff is None: cutoff = float('inf')
+    result, missing = {}, []
+    for lang in langs:
+        found = SEARCH_CACHE.get(_cache_key(G, 'candidates', source, lang, cutoff, exclude))
+        if found is None: missing.append(lang)
+        else: result[lang] = list(found)
+    if missing:
+        if isinstance(G, CSRGraph): neighbors = G.neighbors
+        else: neighbors = G.adj.__getitem__
+        found = multi_target_candidates(neighbors, lambda x, lang: lang_neighbors(G, x, lang), source, cutoff, missing, exclude=exclude)
+        for lang in missing:
+            SEARCH_CACHE.put(_cache_key(G, 'candidates', source, lang, cutoff, exclude), tuple(found[lang]))
+            result[lang] = found[lang]
+    return result
 
-def evaluate(G, word, candidates, cutoff=4, topn=None):
+def evaluate(G, word, candidates, cutoff=4, topn=None, exclude=None):
     """
     Evaluates candidates from possible translations.
     
@@ -961,21 +2520,69 @@ def evaluate(G, word, candidates, cutoff=4, topn=None):
     minimal coefficient to get more reliable data. And then it returns
     same top candidates.
     
+    Coefficients of all candidates are computed in one traversal from
+    word (see metrics).
+    
     :param G (NetworkX.DiGraph): graph
     :param word (Word): node (word)
     :param candidates (list): list of candidates
     :param cutoff (int): cutoff
     :param topn (None, int): how many best candidates we want to get
     (None for 'auto' mode, int for certain number)
+    :param exclude (set): edges (pairs of words) hidden for this search
     
     :return: sorted list of translations and coefficients
     :rtype: list
     """
     result = {}
     mean = 0
-    for translation in candidates:
-        result[translation] = metric(G, word, translation, cutoff=cutoff)
+    for translation, coef in zip(candidates, metrics(G, word, candidates, cutoff=cutoff, exclude=exclude)):
+        result[translation] = coef
         mean += result[translation]
+    return select(result, mean, cutoff=cutoff, topn=topn)
+
+def evaluate_multi(G, word, candidates, cutoff=4, topn=None, exclude=None):
+    """
+    evaluate for candidates in several languages: coefficients of all
+    candidates are computed in one traversal from word (see metrics),
+    then selected for every language separately.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param word (Word): node (word)
+    :param candidates (dict): language -> list of candidates
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param exclude (set): edges (pairs of words) hidden for this search
+    
+    :return: language -> sorted list of translations and coefficients
+    :rtype: dict
+    """
+    translations = [i for lang in candidates for i in candidates[lang]]
+    coefs = dict(zip(translations, metrics(G, word, translations, cutoff=cutoff, exclude=exclude)))
+    results = {}
+    for lang in candidates:
+        result = {}
+        mean = 0
+        for translation in candidates[lang]:
+            result[translation] = coefs[translation]
+            mean += result[translation]
+        results[lang] = select(result, mean, cutoff=cutoff, topn=topn)
+    return results
+
+def select(result, mean, cutoff=4, topn=None):
+    """
+    Top-N or "auto" selection of evaluated candidates (see evaluate).
+    
+    :param result (dict): candidate -> coefficient
+    :param mean (float): sum of coefficients
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    
+    :return: sorted list of translations and coefficients
+    :rtype: list
+    """
     result = [(x, result[x]) for x in sorted(result, key=result.get, reverse=True)]
     if topn: return result[:topn]
     else:
@@ -986,6 +2593,194 @@ def evaluate(G, word, candidates, cutoff=4, topn=None):
         result = [x for x in result if x[1] > mean]
         return result
 
+def walk_matrix(G):
+    """
+    Sparse adjacency matrix of graph (SciPy CSR, rows - sources) for
+    scoring='walks'. Built once and kept in G.graph['walk_matrix'] (the
+    graph must not be changed after that, see exclude in
+    walk_evaluate).
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    
+    :return: matrix, nodes (Word for every row), node -> row, language
+    of every row
+    :rtype: tuple
+    """
+    if 'walk_matrix' not in G.graph:
+        from scipy import sparse
+        if isinstance(G, CSRGraph):
+            A = sparse.csr_matrix((np.ones(len(G.indices)), G.indices, G.indptr), shape=(len(G), len(G)))
+            if G.removed is not None: A.data[G.removed] = 0
+            A.eliminate_zeros()
+            nodes, ids = G.words, G.ids
+        else:
+            nodes = list(G)
+            ids = {word: i for i, word in enumerate(nodes)}
+            A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format='csr')
+            A = sparse.csr_matrix(A, dtype=np.float64)
+        langs = np.array([word.lang for word in nodes], dtype=object)
+        G.graph['walk_matrix'] = (A, nodes, ids, langs)
+    return G.graph['walk_matrix']
+
+def walk_evaluate(G, words, lang, cutoff=4, topn=None, exclude=None, batch=256):
+    """
+    Alternative scoring (scoring='walks'): coefficient of translation is
+    sum(exp^(-k-1) * number of walks with k edges), k <= cutoff, from
+    word to translation (walks can repeat nodes, so they are counted
+    with sparse matrix products: rows of A^k for a batch of words).
+    Candidates are all nodes in target language with non-zero
+    coefficient, then the same selection as in evaluate (select).
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param words (list): source words (nodes)
+    :param lang (str): target language
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param exclude (set): edges (pairs of words) that walks can't use
+    :param batch (int): number of source words in one product
+    
+    :return: sorted list of translations and coefficients for every word
+    :rtype: list
+    """
+    from scipy import sparse
+    A, nodes, ids, langs = walk_matrix(G)
+    columns = np.flatnonzero(langs == lang)
+    hidden = [(ids[u], ids[v]) for u, v in exclude or () if u in ids and v in ids and A[ids[u], ids[v]]]
+    if hidden:
+        rows, cols = zip(*hidden)
+        A = A - sparse.csr_matrix((np.ones(len(hidden)), (rows, cols)), shape=A.shape)
+    results = []
+    for start in range(0, len(words), batch):
+        part = [ids[i] for i in words[start:start+batch]]
+        X = sparse.csr_matrix((np.ones(len(part)), (np.arange(len(part)), part)), shape=(len(part), A.shape[0]))
+        scores = sparse.csr_matrix((len(part), len(columns)))
+        for k in range(1, cutoff + 1):
+            X = X @ A
+            scores = scores + exp(-k-1) * X[:, columns]
+        for row in range(len(part)):
+            line = scores.getrow(row)
+            order = np.argsort(line.indices)
+            result, mean = {}, 0
+            for column, coef in zip(line.indices[order], line.data[order]):
+                if coef > 0:
+                    result[nodes[columns[column]]] = coef
+                    mean += coef
+            results.append(select(result, mean, cutoff=cutoff, topn=topn))
+    return results
+
+SHARED = {} # graph for worker processes (see translate)
+
+def _share(items):
+    """Pool initializer where fork is not available: items are pickled"""
+    SHARED.update(items)
+
+def _score_words(args):
+    """
+    Scores a part of words in a worker process (graph from SHARED)
+    
+    :param args (tuple): words, lang, cutoff, topn, scoring
+    
+    :return: sorted list of translations and coefficients for every word
+    :rtype: list
+    """
+    words, lang, cutoff, topn, scoring = args
+    G = SHARED['graph']
+    if scoring == 'walks': return walk_evaluate(G, words, lang, cutoff=cutoff, topn=topn)
+    return [evaluate(G, i, possible_translations(G, i, lang, cutoff=cutoff), cutoff=cutoff, topn=topn) for i in words]
+
+def _score_words_multi(args):
+    """
+    Scores a part of words for several languages in a worker process
+    (see translate_multi)
+    
+    :param args (tuple): (word, languages) pairs, cutoff, topn
+    
+    :return: language -> sorted list of translations and coefficients
+    for every word
+    :rtype: list
+    """
+    words, cutoff, topn = args
+    G = SHARED['graph']
+    return [evaluate_multi(G, i, possible_translations_multi(G, i, langs, cutoff=cutoff), cutoff=cutoff, topn=topn) for i, langs in words]
+
+def _parallel_scores(G, words, args, jobs, func=_score_words):
+    """
+    Results of func (_score_words) for all words from jobs processes
+    in order of words. Workers are forked after the graph is loaded, so
+    they read parent's graph (copy-on-write) instead of loading or
+    receiving it. Words are split into contiguous parts.
+    
+    :param args (tuple): other arguments of func
+    
+    :yield: sorted list of translations and coefficients for every word
+    """
+    size = max(1, -(-len(words) // (jobs * 8)))
+    parts = [(words[i:i+size],) + args for i in range(0, len(words), size)]
+    SHARED['graph'] = G
+    try: pool = get_context('fork').Pool(jobs)
+    except ValueError: pool = Pool(jobs, initializer=_share, initargs=({'graph': G},))
+    try:
+        with pool:
+            for results in pool.imap(func, parts):
+                for result in results: yield result
+    finally:
+        SHARED.pop('graph', None)
+
+def translate(G, words, lang, cutoff=4, topn=None, scoring='paths', jobs=1):
+    """
+    Translations for words that have no translation into lang in graph.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param words (iterable): source words
+    :param lang (str): target language
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param scoring (str): 'paths' (possible_translations + evaluate) or
+    'walks' (walk_evaluate)
+    :param jobs (int): number of worker processes (results are the same
+    and in the same order as with one process)
+    
+    :yield: word, sorted list of translations and coefficients (only
+    words with some translations)
+    :ytype: Word, list
+    """
+    words = [i for i in words if i in G and not len(lang_neighbors(G, i, lang))]
+    if jobs > 1 and len(words) > 1: results = _parallel_scores(G, words, (lang, cutoff, topn, scoring), jobs)
+    elif scoring == 'walks': results = walk_evaluate(G, words, lang, cutoff=cutoff, topn=topn)
+    else: results = (evaluate(G, i, possible_translations(G, i, lang, cutoff=cutoff), cutoff=cutoff, topn=topn) for i in words)
+    for i, result in zip(words, tqdm(results, total=len(words))):
+        if result: yield i, result
+
+def translate_multi(G, words, langs, cutoff=4, topn=None, jobs=1):
+    """
+    translate for several target languages: candidates of word in all
+    languages it has no translation into are found in one traversal
+    (possible_translations_multi) and scored in one traversal
+    (evaluate_multi). Results are the same as from translate for every
+    language.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param words (iterable): source words
+    :param langs (list): target languages
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param jobs (int): number of worker processes
+    
+    :yield: word, language -> sorted list of translations and
+    coefficients (only words and languages with some translations)
+    :ytype: Word, dict
+    """
+    words = [(i, [lang for lang in langs if not len(lang_neighbors(G, i, lang))]) for i in words if i in G]
+    words = [i for i in words if i[1]]
+    if jobs > 1 and len(words) > 1: results = _parallel_scores(G, words, (cutoff, topn), jobs, func=_score_words_multi)
+    else: results = (evaluate_multi(G, i, possible_translations_multi(G, i, langs, cutoff=cutoff), cutoff=cutoff, topn=topn) for i, langs in words)
+    for (i, langs), result in zip(words, tqdm(results, total=len(words))):
+        result = {lang: result[lang] for lang in langs if result[lang]}
+        if result: yield i, result
+
 def lemma_search (G, lemma, d_l1, lang2, cutoff=4, topn=None):
     lemmas = [i for i in d_l1.lemma(lemma) if i in G.nodes()]
     results = {word:{} for word in lemmas}
@@ -995,9 +2790,111 @@ def lemma_search (G, lemma, d_l1, lang2, cutoff=4, topn=None):
         del candidates
     return results
 
+# RESULT CACHE
+
+RESULTS = './results/'
+RESULT_CACHE_SIZE = 1 << 30 # bytes, all cached results together
+
+def result_key(languages, kind, lang, cutoff, topn, scoring='paths'):
+    """
+    Key of cached results: graph (graph_key, both engines give the same
+    results) and search parameters.
+    
+    :param languages (set): languages of graph
+    :param kind (str): 'preview' (translate) or 'lemma' (lemma_search)
+    :param lang (str): target language
+    :param cutoff (int): cutoff
+    :param topn (None, int): topn
+    :param scoring (str): 'paths' or 'walks'
+    
+    :rtype: str
+    """
+    sources = [graph_key(languages), kind, lang, cutoff, topn, scoring]
+    return hashlib.sha256(json.dumps(sources).encode('utf-8')).hexdigest()
+
+def read_results(key):
+    """
+    Cached results (word -> result, None if there is no such key or
+    they can't be read, see load_pickle). Reading marks them as
+    recently used.
+    
+    :param key (str): key (see result_key)
+    
+    :rtype: dict, None
+    """
+    return load_pickle(RESULTS, key)
+
+def write_results(key, results, info, limit=None):
+    """
+    Saves results (pickle, written atomically) and removes least
+    recently used ones (see evict_files).
+    
+    :param key (str): key (see result_key)
+    :param results (dict): word -> result
+    :param info (dict): description for manifest (see result_cache)
+    :param limit (int): size limit for all results in bytes (None -
+    RESULT_CACHE_SIZE)
+    """
+    os.makedirs(RESULTS, exist_ok=True)
+    filename = RESULTS+key+'.pickle'
+    dump_pickle(results, filename)
+    record = dict(info)
+    record.update({'words': len(results), 'size': os.path.getsize(filename), 'used': time.time()})
+    with locked_manifest(RESULTS+'manifest.json') as manifest:
+        manifest[key] = record
+        evict_files(manifest, RESULTS, key, RESULT_CACHE_SIZE if limit is None else limit)
+
+def cached_results(key, words, compute, info):
+    """
+    Results for words: cached ones are read, others are computed and
+    added to the cache.
+    
+    :param key (str): key (see result_key)
+    :param words (list): words
+    :param compute (function): list of words -> dict word -> result
+    (for every word, None if word has no result)
+    :param info (dict): description for manifest
+    
+    :return: word -> result for every word
+    :rtype: dict
+    """
+    results = read_results(key)
+    if results is None: results = {}
+    missing = [i for i in words if i not in results]
+    logging.info('cached results: {} of {} words'.format(len(words) - len(missing), len(words)))
+    if missing:
+        results.update(compute(missing))
+        write_results(key, results, info)
+    return {i: results[i] for i in words}
+
+def result_cache(action='stats', graphs=False):
+    """
+    Statistics (action='stats') or removing (action='clear') of cached
+    results (and graph snapshots if graphs is set).
+    
+    :param action (str): 'stats' or 'clear'
+    :param graphs (bool): graph snapshots too
+    """
+    caches = [('results', RESULTS, RESULT_CACHE_SIZE)]
+    if graphs: caches.append(('graphs', GRAPHS, GRAPH_CACHE_SIZE))
+    for name, path, limit in caches:
+        if action == 'clear':
+            if os.path.exists(path):
+                with locked_manifest(path+'manifest.json') as manifest: evict_files(manifest, path, None, 0)
+            print('{}: cleared'.format(name))
+            continue
+        manifest = load_manifest(path+'manifest.json')
+        print('{}: {} entries, {:.1f} of {:.1f} MB'.format(name, len(manifest), sum(i['size'] for i in manifest.values()) / 2**20, limit / 2**20))
+        for key in sorted(manifest, key=lambda x: manifest[x]['used'], reverse=True):
+            record = manifest[key]
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(record['used']))
+            if name == 'graphs': description = ' '.join(record['languages'])
+            else: description = '{} {} {} cutoff={} topn={} {} words'.format(record['pair'], record['kind'], record['scoring'], record['cutoff'], record['topn'], record['words'])
+            print('{}\t{:.1f} MB\t{}\t{}'.format(key[:12], record['size'] / 2**20, used, description))
+
 # EVALUATION
 
-def node_search(G, node, lang2, cutoff=4, topn=None):
+def node_search(G, node, lang2, cutoff=4, topn=None, exclude=None, scoring='paths'):
     """
     Returns translations (without coefficients) for a particular node
     using possible_translations and evaluate functions.
@@ -1008,16 +2905,20 @@ def node_search(G, node, lang2, cutoff=4, topn=None):
     :param cutoff (int): cutoff
     :param topn (None, int): how many best candidates we want to get
     (None for 'auto' mode, int for certain number)
+    :param exclude (set): edges (pairs of words) hidden for this search
+    :param scoring (str): 'paths' or 'walks' (see translate)
     
     :return: sorted list of translations
     :rtype: list
     """
     if node not in G.nodes(): return None
-    candidates = possible_translations(G, node, lang2, cutoff=cutoff)
-    results = evaluate(G, node, candidates, cutoff=cutoff, topn=topn)
+    if scoring == 'walks':
+        return [i[0] for i in walk_evaluate(G, [node], lang2, cutoff=cutoff, topn=topn, exclude=exclude)[0]]
+    candidates = possible_translations(G, node, lang2, cutoff=cutoff, exclude=exclude)
+    results = evaluate(G, node, candidates, cutoff=cutoff, topn=topn, exclude=exclude)
     return [i[0] for i in results]
 
-def two_node_search (G, node1, node2, lang1, lang2, cutoff=4, topn=None):
+def two_node_search (G, node1, node2, lang1, lang2, cutoff=4, topn=None, scoring='paths'):
     """
     Evaluation of pair of real translations.
     
@@ -1032,20 +2933,23 @@ def two_node_search (G, node1, node2, lang1, lang2, cutoff=4, topn=None):
     
     (0,1): there is some truth but not perfect translation
     
+    The pair's own edges are hidden only for these two searches (graph
+    is not changed), so results don't depend on order of pairs.
+    
     :param G (NetworkX.DiGraph): graph
     :param node1, node2 (Word): nodes (two words)
     :param lang1, lang2 (str): languages
     :param cutoff (int): cutoff
     :param topn (None, int): mode for top-N candidates (None for 'auto'
     mode, int for certain number)
+    :param scoring (str): 'paths' or 'walks' (see translate)
     
     :return: coefficient
     :rtype: float
     """
-    if (node1, node2) in G.edges(): G.remove_edge(node1, node2)
-    if (node2, node1) in G.edges(): G.remove_edge(node2, node1)
-    res1 = node_search(G, node1, lang2, cutoff=cutoff, topn=topn)
-    res2 = node_search(G, node2, lang1, cutoff=cutoff, topn=topn)
+    exclude = set([(node1, node2), (node2, node1)])
+    res1 = node_search(G, node1, lang2, cutoff=cutoff, topn=topn, exclude=exclude, scoring=scoring)
+    res2 = node_search(G, node2, lang1, cutoff=cutoff, topn=topn, exclude=exclude, scoring=scoring)
     coefficient = 0
     if not topn: topn = 1000
     if node2 in res1: 
@@ -1058,7 +2962,7 @@ def two_node_search (G, node1, node2, lang1, lang2, cutoff=4, topn=None):
         else: coefficient += 0.01
     return coefficient
 
-def _one_iter(lang1, lang2, G, l1, cutoff=4, topn=None, ncheck=1000):
+def _one_iter(lang1, lang2, G, l1, cutoff=4, topn=None, ncheck=1000, scoring='paths'):
     """
     One iteration of evaluation.
     
@@ -1081,24 +2985,25 @@ def _one_iter(lang1, lang2, G, l1, cutoff=4, topn=None, ncheck=1000):
     :param cutoff (int): cutoff
     :param topn (None, int): mode for top-N candidates
     (None for 'auto' mode, int for certain number)
+    :param scoring (str): 'paths' or 'walks' (see translate)
     """
     candidates = random.sample(l1, len(l1))
     pairs = []
     for i in candidates:
         if len(pairs) < ncheck and i in G.nodes():
-            ne = list(G.neighbors(i))
-            s = FilteredList(ne).lang(lang2)
-            if len(s) == 1 and len(ne) > 1:
-                ne = list(G.neighbors(s[0]))
-                if len(FilteredList(ne).lang(lang1)) == 1 and len(ne)>1 and FilteredList(ne).lang(lang1)[0]==i:
+            s = lang_neighbors(G, i, lang2)
+            if len(s) == 1 and G.out_degree(i) > 1:
+                back = lang_neighbors(G, s[0], lang1)
+                if len(back) == 1 and G.out_degree(s[0]) > 1 and back[0] == i:
                     pairs.append((i, s[0]))
         elif len(pairs) >= ncheck: break
     if len(pairs) == 0: print ('no one-variant')
     pairs2 = pairs[:ncheck]
     result = []
+    start = time.time()
     for i in tqdm(pairs): 
-        result.append(two_node_search (G, i[0], i[1], lang1, lang2, cutoff=cutoff, topn=topn))
-    print ('N='+str(len(pairs2)))
+        result.append(two_node_search (G, i[0], i[1], lang1, lang2, cutoff=cutoff, topn=topn, scoring=scoring))
+    print ('N='+str(len(pairs2))+', scoring: {}, {} s'.format(scoring, round(time.time() - start, 2)))
     try:
         precision = sum(1 for i in result if i == 1) / sum(1 for i in result if i > 0)
         recall = sum(1 for i in result if i == 1) / sum(1 for i in result)
@@ -1108,7 +3013,7 @@ def _one_iter(lang1, lang2, G, l1, cutoff=4, topn=None, ncheck=1000):
         print ('error')
     del G, pairs
 
-def eval_loop(lang1, lang2, n=10, topn=None, n_iter=3, cutoff=4, ncheck=1000):
+def eval_loop(lang1, lang2, n=10, topn=None, n_iter=3, cutoff=4, ncheck=1000, engine='networkx', scoring='paths'):
     """
     Calculates precision, recall and f1 for language pair.
     
@@ -1119,21 +3024,24 @@ def eval_loop(lang1, lang2, n=10, topn=None, n_iter=3, cutoff=4, ncheck=1000):
     :param n_iter (int): how many iterations of evaluation
     :param cutoff (int): cutoff
     :param ncheck (int): how many translations we check
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param scoring (str): 'paths' or 'walks' (see translate)
     """
     logging.info('Start ~ 20 s')
     n, cutoff, n_iter = int(n), int(cutoff), int(n_iter)
     if topn: topn = int(topn)
     get_relevant_languages(lang1, lang2)
-    load_file(lang1, lang2, n=n)
     l1, l2 = dictionaries(lang1, lang2)
     #k = len(l1)
     #if k > 10000: k =10000
     #elif k < 1000: return 'less than 1000'
     #else: k = len(l1)
+    G = load_graph(lang1, lang2, n=n, engine=engine)
     for i in range(n_iter):
-        logging.info('Initialization '+str(i+1)+' ~ 1 min')
-        G = built_from_file('{}-{}'.format(lang1,lang2))
-        _one_iter(lang1, lang2, G, l1, cutoff=cutoff, topn=topn, ncheck=ncheck)
+        logging.info('Iteration '+str(i+1))
+        _one_iter(lang1, lang2, G, l1, cutoff=cutoff, topn=topn, ncheck=ncheck, scoring=scoring)
+        logging.info('search cache: '+str(SEARCH_CACHE))
 
 #def change_encoding(file):
 #    "Change utf-16 that works with accents inside program to utf-8 to reduce file size (doesn't cause problems in this case)"
@@ -1144,7 +3052,7 @@ def eval_loop(lang1, lang2, n=10, topn=None, n_iter=3, cutoff=4, ncheck=1000):
 #    with open(file, 'w', encoding='utf-8') as f:
 #        f.write(text)
 
-def addition(lang1, lang2, n=10, cutoff=4):
+def addition(lang1, lang2, n=10, cutoff=4, engine='networkx'):
     """
     How many entries we can add LR and RL side (both only after merging
     - in a real file)
@@ -1153,17 +3061,17 @@ def addition(lang1, lang2, n=10, cutoff=4):
     :param n (int): number of best languages to use in graph
     :param n_iter (int): how many iterations of evaluation
     :param cutoff (int): cutoff
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
     """
-    logging.info('Initialization ~ 1 min')
+    logging.info('Initialization')
     get_relevant_languages(lang1, lang2)
-    load_file(lang1, lang2, n=n)
-    #change_encoding('{}-{}'.format(lang1,lang2))
-    G = built_from_file('{}-{}'.format(lang1,lang2))
+    G = load_graph(lang1, lang2, n=n, engine=engine)
     l1, l2 = dictionaries(lang1, lang2)
     k1, k2 = [0,0,0,0], [0,0,0,0] #existant, failed, new, errors
     for node in tqdm(l1):
         if node in G:
-            s = FilteredList(list(G.neighbors(node))).lang(lang2)
+            s = lang_neighbors(G, node, lang2)
             if not len(s):
                 candidates = possible_translations(G, node, lang2, cutoff=cutoff)
                 if candidates: k1[2] += 1
@@ -1176,7 +3084,7 @@ def addition(lang1, lang2, n=10, cutoff=4):
     
     for node in tqdm(l2):
         if node in G:
-            s = FilteredList(list(G.neighbors(node))).lang(lang1)
+            s = lang_neighbors(G, node, lang1)
             if not len(s):
                 candidates = possible_translations(G, node, lang1, cutoff=cutoff)
                 if candidates: k2[2] += 1
@@ -1198,7 +3106,55 @@ def addition(lang1, lang2, n=10, cutoff=4):
 #                result = evaluate(G, i, candidates, cutoff=4)
 #                if result: yield i, result
 
-def get_translations(lang1, lang2, cutoff=4, topn=None):
+def lazy_graph(lang1, lang2, n=10, engine='networkx'):
+    """
+    Function that loads graph for a pair (see load_graph) on the first
+    call and returns the same graph after that, so graph is not loaded
+    if all results are cached.
+    
+    :param lang1, lang2 (str): languages
+    :param n (int): number of best languages to use in graph
+    :param engine (str): graph engine
+    
+    :rtype: function
+    """
+    graphs = []
+    def graph():
+        if not graphs: graphs.append(load_graph(lang1, lang2, n=n, engine=engine))
+        return graphs[0]
+    return graph
+
+def cached_translate(graph, languages, pair, words, lang, cutoff=4, topn=None, scoring='paths', jobs=1):
+    """
+    translate with results kept on disk (see cached_results): only
+    words that are not cached for this graph (graph_key) and parameters
+    are translated.
+    
+    :param graph (function): returns graph (see lazy_graph)
+    :param languages (set): languages of graph
+    :param pair (str): pair of languages (for manifest)
+    :param words (iterable): source words
+    :param lang (str): target language
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param scoring (str): 'paths' or 'walks' (see translate)
+    :param jobs (int): number of worker processes (see translate)
+    
+    :return: word, sorted list of translations and coefficients (only
+    words with some translations)
+    :rtype: list
+    """
+    key = result_key(languages, 'preview', lang, cutoff, topn, scoring)
+    info = {'pair': pair, 'kind': 'preview', 'lang': lang, 'cutoff': cutoff, 'topn': topn, 'scoring': scoring}
+    def compute(missing):
+        found = dict.fromkeys(missing)
+        found.update(translate(graph(), missing, lang, cutoff=cutoff, topn=topn, scoring=scoring, jobs=jobs))
+        return found
+    results = cached_results(key, list(words), compute, info)
+    return [(i, results[i]) for i in results if results[i]]
+
+def get_translations(lang1, lang2, n=10, cutoff=4, topn=None, engine='networkx', scoring='paths', jobs=1, incremental=False, cache=True):
     """
     Steps:
     1. Loading dictionaries
@@ -1210,34 +3166,187 @@ def get_translations(lang1, lang2, cutoff=4, topn=None):
     :param n (int): number of best languages to use in graph
     :param n_iter (int): how many iterations of evaluation
     :param cutoff (int): cutoff
-    """
-    logging.info('Initialization (~1 min)')
-    G = built_from_file('{}-{}'.format(lang1,lang2))
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param scoring (str): 'paths' or 'walks' (see translate)
+    :param jobs (int): number of worker processes (see translate)
+    :param incremental (bool): re-score only words affected by changes
+    of graph since the previous incremental run (see rescore)
+    :param cache (bool): use cached results of previous runs with the
+    same graph and parameters (see cached_translate)
+    """
+    logging.info('Initialization')
     l1, l2 = dictionaries(lang1, lang2)
+    if cache and not incremental:
+        graph = lazy_graph(lang1, lang2, n=n, engine=engine)
+        languages = graph_languages(lang1, lang2, n=n)
+        pair = '{}-{}'.format(lang1, lang2)
+        LR = cached_translate(graph, languages, pair, l1, lang2, cutoff=4, scoring=scoring, jobs=jobs)
+        RL = cached_translate(graph, languages, pair, l2, lang1, cutoff=4, scoring=scoring, jobs=jobs)
+    elif incremental:
+        G = load_graph(lang1, lang2, n=n, engine=engine)
+        LR, RL = rescore(G, lang1, lang2, l1, l2, cutoff=4, scoring=scoring, jobs=jobs)
+    else:
+        G = load_graph(lang1, lang2, n=n, engine=engine)
+        LR = translate(G, l1, lang2, cutoff=4, scoring=scoring, jobs=jobs)
+        RL = translate(G, l2, lang1, cutoff=4, scoring=scoring, jobs=jobs)
     RESULT = {}
-    for i in tqdm(l1):
-        if i in G:
-            ne = list(G.neighbors(i))
-            s = FilteredList(ne).lang(lang2)
-            if len(s) == 0:
-                candidates = possible_translations(G, i, lang2, cutoff=4)
-                result = evaluate(G, i, candidates, cutoff=4)
-                if result:
-                    for j in result: RESULT[(i, j[0])] = [j[1], 0]
-    for i in tqdm(l2):
-        if i in G:
-            ne = list(G.neighbors(i))
-            s = FilteredList(ne).lang(lang1)
-            if len(s) == 0:
-                candidates = possible_translations(G, i, lang1, cutoff=4)
-                result = evaluate(G, i, candidates, cutoff=4)
-                if result:
-                    for j in result: 
-                        if (j[0], i) in RESULT: RESULT[(j[0], i)][1] = j[1]
-                        else: RESULT[(j[0], i)] = [0, j[1]]
+    for i, result in dict(LR).items():
+        for j in result: RESULT[(i, j[0])] = [j[1], 0]
+    for i, result in dict(RL).items():
+        for j in result: 
+            if (j[0], i) in RESULT: RESULT[(j[0], i)][1] = j[1]
+            else: RESULT[(j[0], i)] = [0, j[1]]
+    logging.info('search cache: '+str(SEARCH_CACHE))
+    write_preview(lang1, lang2, RESULT)
+
+STATE_VERSION = 1 # states of older versions are not used
+
+def adjacency(G):
+    """
+    Successors of every node in order of graph (state of graph for
+    rescore).
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    
+    :return: node -> successors
+    :rtype: dict
+    """
+    if isinstance(G, CSRGraph): return {word: tuple(G.words[G.successors(i)]) for i, word in enumerate(G.words)}
+    return {word: tuple(G.adj[word]) for word in G}
+
+def affected_words(G, seeds, cutoff=4):
+    """
+    Words whose results can depend on changed nodes: a result of word
+    depends only on edges of paths (walks) with at most cutoff edges
+    from it, the first changed edge of such path starts in a seed at
+    most cutoff - 1 steps from word by unchanged edges. So it is a
+    reverse BFS from seeds in the new graph.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): new graph
+    :param seeds (set): nodes with changed successors (edges or their
+    order)
+    :param cutoff (int): cutoff
+    
+    :rtype: set
+    """
+    if isinstance(G, CSRGraph): predecessors = lambda x: G.words[G.predecessors(G.ids[x])]
+    else: predecessors = lambda x: G.pred[x]
+    affected = set(seeds)
+    level = [i for i in seeds if i in G]
+    for _ in range(cutoff - 1):
+        nextlevel = []
+        for v in level:
+            for u in predecessors(v):
+                if u not in affected:
+                    affected.add(u)
+                    nextlevel.append(u)
+        level = nextlevel
+    return affected
+
+def rescore(G, lang1, lang2, l1, l2, cutoff=4, topn=None, scoring='paths', jobs=1):
+    """
+    Results of both directions of preview (see translate) with
+    re-scoring only what changed since the previous call for this pair.
+    
+    State of the previous call ('<lang1>-<lang2>-state', pickle) keeps
+    results for every word, words of both dictionaries and adjacency of
+    graph. Nodes whose successors changed (edges or their order, see
+    adjacency) are seeds, words near them (affected_words) and new
+    words of dictionaries are scored again, results of other words are
+    taken from the state. Without state (or with other parameters, or
+    if it can't be loaded, e.g. pickled before a class changed) all
+    words are scored.
+    
+    :param G (NetworkX.DiGraph, CSRGraph): graph
+    :param lang1, lang2 (str): languages
+    :param l1, l2 (SetWithFilter): dictionaries (see dictionaries)
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param scoring (str): 'paths' or 'walks' (see translate)
+    :param jobs (int): number of worker processes (see translate)
+    
+    :return: word of lang1 -> translations, word of lang2 -> translations
+    :rtype: dict, dict
+    """
+    filename = '{}-{}-state'.format(lang1, lang2)
+    params = {'version': STATE_VERSION, 'cutoff': cutoff, 'topn': topn, 'scoring': scoring}
+    state = None
+    if os.path.exists(filename):
+        try:
+            with open(filename, 'rb') as f: state = pickle.load(f)
+        except Exception as e:
+            logging.warning('{}: {}, full scoring'.format(filename, e))
+            state = None
+    edges = adjacency(G)
+    if state is None or state['params'] != params:
+        LR, RL, words1, words2 = {}, {}, list(l1), list(l2)
+    else:
+        old = state['edges']
+        seeds = set(i for i in edges if old.get(i) != edges[i])
+        seeds.update(i for i in old if i not in edges)
+        affected = affected_words(G, seeds, cutoff=cutoff)
+        LR = {i: result for i, result in state['LR'].items() if i in l1 and i not in affected}
+        RL = {i: result for i, result in state['RL'].items() if i in l2 and i not in affected}
+        words1 = [i for i in l1 if i in affected or i not in state['words1']]
+        words2 = [i for i in l2 if i in affected or i not in state['words2']]
+        logging.info('{} changed nodes, {} affected nodes'.format(len(seeds), len(affected)))
+    logging.info('re-scoring {} of {} and {} of {} words'.format(len(words1), len(l1), len(words2), len(l2)))
+    LR.update(translate(G, words1, lang2, cutoff=cutoff, topn=topn, scoring=scoring, jobs=jobs))
+    RL.update(translate(G, words2, lang1, cutoff=cutoff, topn=topn, scoring=scoring, jobs=jobs))
+    state = {'params': params, 'edges': edges, 'LR': LR, 'RL': RL, 'words1': set(l1), 'words2': set(l2)}
+    dump_pickle(state, filename)
+    return LR, RL
+
+def get_translations_multi(lang1, langs, n=10, cutoff=4, topn=None, engine='networkx', jobs=1):
+    """
+    get_translations for several pairs lang1-lang2 (lang2 in langs)
+    in one run: one graph with top-N languages of every pair, words of
+    lang1 are translated into all languages from one traversal (see
+    translate_multi). One preview file for every pair.
+    
+    :param lang1 (str): source language
+    :param langs (list): target languages
+    :param n (int): number of best languages of every pair to use in
+    graph
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param jobs (int): number of worker processes (see translate)
+    """
+    logging.info('Initialization')
+    languages = set()
+    for lang2 in langs: languages |= graph_languages(lang1, lang2, n=n)
+    G = languages_graph(languages, engine=engine)
+    l1 = dictionary(lang1)
+    RESULTS = {lang2: {} for lang2 in langs}
+    for i, results in translate_multi(G, l1, langs, cutoff=cutoff, topn=topn, jobs=jobs):
+        for lang2 in results:
+            for j in results[lang2]: RESULTS[lang2][(i, j[0])] = [j[1], 0]
+    for lang2 in langs:
+        RESULT = RESULTS[lang2]
+        l2 = dictionary(lang2)
+        for i, result in translate(G, l2, lang1, cutoff=cutoff, topn=topn, jobs=jobs):
+            for j in result:
+                if (j[0], i) in RESULT: RESULT[(j[0], i)][1] = j[1]
+                else: RESULT[(j[0], i)] = [0, j[1]]
+        write_preview(lang1, lang2, RESULT)
+    logging.info('search cache: '+str(SEARCH_CACHE))
+
+def write_preview(lang1, lang2, result):
+    """
+    Writes preview file for human assessment (see get_translations).
+    
+    :param lang1, lang2 (str): languages
+    :param result (dict): (word of lang1, word of lang2) -> [LR
+    coefficient, RL coefficient]
+    """
     with open('{}-{}-preview'.format(lang1, lang2),'w',encoding='utf-8') as f:
-        for i in sorted(RESULT):
-            s = i[0].write(mode='out')+'\t'+i[1].write(mode='out')+'\t'+str(RESULT[i][0])+'\t'+str(RESULT[i][1])+'\n'
+        for i in sorted(result):
+            s = i[0].write(mode='out')+'\t'+i[1].write(mode='out')+'\t'+str(result[i][0])+'\t'+str(result[i][1])+'\n'
             f.write(s)
 
 def parse_preview_line(line, lang1, lang2):
@@ -1259,12 +3368,22 @@ def parse_preview_line(line, lang1, lang2):
     elif float(n1) == 0 and float(n2) > 0: side == 'LR'
     return side, Word(lemma1, lang1, tags1), Word(lemma2, lang2, tags2)
 
-def convert_to_dix(lang1, lang2):
+def convert_to_dix(lang1, lang2, n=10, engine='networkx', scoring='paths', cache=True, preview=False):
     """
-    Converting preview file into section for usual .dix file.
+    Converting preview file into section for usual .dix file. If there
+    is no preview file (or preview is set) it is written first (see
+    get_translations), from cached results if they are.
     
     :param lang1, lang2 (str): languages
+    :param n (int): number of best languages to use in graph
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param scoring (str): 'paths' or 'walks' (see translate)
+    :param cache (bool): use cached results
+    :param preview (bool): write preview file again
      """
+    if preview or not os.path.exists('{}-{}-preview'.format(lang1, lang2)):
+        get_translations(lang1, lang2, n=n, engine=engine, scoring=scoring, cache=cache)
     tree = ET.Element('section')
     with open ("{}-{}-preview".format(lang1, lang2),'r', encoding='utf-8') as inp:
         for line in inp:
@@ -1312,7 +3431,42 @@ def print_lemma_results(results, file):
             print ('{}\t{}'.format(j[0], j[1]), file=file)
         print('', file=file)
 
-def example (lang1, lang2, n=10, cutoff=4, topn=None, input='', lang = '', config=False, load=False, output=''):
+def lemma_results(graph, languages, pair, lemmas, d_l1, lang2, cutoff=4, topn=None, cache=True):
+    """
+    lemma_search for a list of lemmas, results of words are kept on
+    disk (see cached_results) if cache is set.
+    
+    :param graph (function): returns graph (see lazy_graph)
+    :param languages (set): languages of graph
+    :param pair (str): pair of languages (for manifest)
+    :param lemmas (list): lemmas
+    :param d_l1 (SetWithFilter): dictionary of source language
+    :param lang2 (str): target language
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param cache (bool): use cached results
+    
+    :return: lemma -> results of lemma_search
+    :rtype: dict
+    """
+    words = {lemma: d_l1.lemma(lemma) for lemma in lemmas}
+    def compute(missing):
+        G = graph()
+        found = {}
+        for i in tqdm(missing):
+            if i in G: found[i] = evaluate(G, i, possible_translations(G, i, lang2, cutoff=cutoff), cutoff=cutoff, topn=topn)
+            else: found[i] = None
+        return found
+    unique = list(set(i for lemma in lemmas for i in words[lemma]))
+    if cache:
+        key = result_key(languages, 'lemma', lang2, cutoff, topn)
+        info = {'pair': pair, 'kind': 'lemma', 'lang': lang2, 'cutoff': cutoff, 'topn': topn, 'scoring': 'paths'}
+        found = cached_results(key, unique, compute, info)
+    else: found = compute(unique)
+    return {lemma: {i: found[i] for i in words[lemma] if found[i] is not None} for lemma in lemmas}
+
+def example (lang1, lang2, n=10, cutoff=4, topn=None, input='', lang = '', config=False, load=False, output='', engine='networkx', cache=True):
     """
     Allows to see in human-readable way how this tool works with
     coefficients and possible translations.
@@ -1322,12 +3476,15 @@ def example (lang1, lang2, n=10, cutoff=4, topn=None, input='', lang = '', confi
     :param cutoff (int): cutoff
     :param topn (int): top-n candidates to print
     :param lang (str): source language
-    :param load (bool): create loading file
+    :param load (bool): export loading file
     :param config (bool): create config file
     :param input (str): input file name
     :param output (str): outpur file name, by default - stdout
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param cache (bool): use cached results (see lemma_results)
     """
-    logging.info('Initialization ~1 min')
+    logging.info('Initialization')
     if not input: print('Please, specify input file!')
     if output: file = open(output, 'w', encoding='utf-8')
     else: output = sys.stdout
@@ -1339,19 +3496,17 @@ def example (lang1, lang2, n=10, cutoff=4, topn=None, input='', lang = '', confi
     if load: 
         load_file(lang1, lang2, n=n)
         logging.info('loading file')
-    G = built_from_file('{}-{}'.format(lang1,lang2))
+    graph = lazy_graph(lang1, lang2, n=n, engine=engine)
+    languages = graph_languages(lang1, lang2, n=n)
     l1, l2 = dictionaries(lang1, lang2)
     logging.info('Translating')
-    if lang == lang1:
-        for word in tqdm(words):
-            print('Lemma: '+word, file=file)
-            print_lemma_results(lemma_search (G, word, l1, lang2, cutoff=cutoff, topn=topn), file=file)
-            print('---------------------------------------------', file=file)
-    elif lang == lang2:
-        for word in tqdm(words):
-            print('Lemma: '+word, file=file)
-            print_lemma_results(lemma_search (G, word, l2, lang1, cutoff=cutoff, topn=topn), file=file)
-            print('---------------------------------------------', file=file)
+    if lang == lang1: results = lemma_results(graph, languages, '{}-{}'.format(lang1, lang2), words, l1, lang2, cutoff=cutoff, topn=topn, cache=cache)
+    elif lang == lang2: results = lemma_results(graph, languages, '{}-{}'.format(lang1, lang2), words, l2, lang1, cutoff=cutoff, topn=topn, cache=cache)
+    else: return
+    for word in words:
+        print('Lemma: '+word, file=file)
+        print_lemma_results(results[word], file=file)
+        print('---------------------------------------------', file=file)
 
 def _sub_addition(lang1, lang2, l1, G, cutoff):
     """
@@ -1360,7 +3515,7 @@ def _sub_addition(lang1, lang2, l1, G, cutoff):
     k1 = [0,0,0,0]  #existant, failed, new, errors
     for node in l1:
         if node in G:
-            s = FilteredList(list(G.neighbors(node))).lang(lang2)
+            s = lang_neighbors(G, node, lang2)
             if not len(s):
                 candidates = possible_translations(G, node, lang2, cutoff=cutoff)
                 if candidates: k1[2] += 1
@@ -1371,14 +3526,16 @@ def _sub_addition(lang1, lang2, l1, G, cutoff):
     else: c = 0
     print ('{}->{}    Exist: {}, failed: {}, NEW: {} +{}%, NA: {}'.format(lang1, lang2, k1[0], k1[1], k1[2], round(c, 0), k1[3]))
 
-def _one_iter_grid(lang1, lang2, n, cutoff, topns, ncheck):
+def _one_iter_grid(lang1, lang2, n, cutoff, topns, ncheck, engine='networkx'):
     """
     One iter of grid search.
+    
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
     """
     print('n: {}\tcutoff: {}'.format(n, cutoff))
     get_relevant_languages(lang1, lang2)
-    load_file(lang1, lang2, n=n)
-    G = built_from_file('{}-{}'.format(lang1,lang2))
+    G = load_graph(lang1, lang2, n=n, engine=engine)
     l1, l2 = dictionaries(lang1, lang2)
     _sub_addition(lang1, lang2, l1, G, cutoff=cutoff)
     _sub_addition(lang2, lang1, l2, G, cutoff=cutoff)
@@ -1387,11 +3544,10 @@ def _one_iter_grid(lang1, lang2, n, cutoff, topns, ncheck):
         pairs = []
         for i in candidates:
             if len(pairs) < ncheck and i in G.nodes():
-                ne = list(G.neighbors(i))
-                s = FilteredList(ne).lang(lang2)
-                if len(s) == 1 and len(ne) > 1:
-                    ne = list(G.neighbors(s[0]))
-                    if len(FilteredList(ne).lang(lang1)) == 1 and len(ne)>1 and FilteredList(ne).lang(lang1)[0]==i:
+                s = lang_neighbors(G, i, lang2)
+                if len(s) == 1 and G.out_degree(i) > 1:
+                    back = lang_neighbors(G, s[0], lang1)
+                    if len(back) == 1 and G.out_degree(s[0]) > 1 and back[0] == i:
                         pairs.append((i, s[0]))
             elif len(pairs) >= ncheck: break
         if len(pairs) == 0: print ('no one-variant')
@@ -1409,7 +3565,7 @@ def _one_iter_grid(lang1, lang2, n, cutoff, topns, ncheck):
             print ('error')
     del G, pairs
     
-def grid(lang1, lang2, n, cutoff, topn, ncheck=1000):
+def grid(lang1, lang2, n, cutoff, topn, ncheck=1000, engine='networkx'):
     """
     This function allows to run a parameter search (grid search) to find best parameters for a translation.
     
@@ -1418,10 +3574,312 @@ def grid(lang1, lang2, n, cutoff, topn, ncheck=1000):
     :param cutoff (int): cutoff
     :param topn (int): top-n candidates to print
     :param ncheck (int): how many translations to check
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
     """
     if None not in topn: topn.append(None)
     for i in n:
         for j in cutoff:
-            _one_iter_grid(lang1, lang2, n=i, cutoff=j, topns=topn, ncheck=ncheck)
+            _one_iter_grid(lang1, lang2, n=i, cutoff=j, topns=topn, ncheck=ncheck, engine=engine)
             print('===============================================================')
-    
\ No newline at end of file
+    
+
+# BATCH
+
+def read_pairs(input):
+    """
+    Language pairs from file: one pair per line ('eng spa' or
+    'eng-spa'), text after # is ignored. Repeated pairs are skipped.
+    
+    :param input (str): file name
+    
+    :rtype: list
+    """
+    pairs = []
+    with open(input, 'r', encoding='utf-8') as f:
+        for line in f:
+            pair = tuple(line.split('#')[0].replace('-', ' ').split())
+            if len(pair) == 2 and pair not in pairs: pairs.append(pair)
+    return pairs
+
+def group_pairs(pairs, n=10, overlap=0.8):
+    """
+    Groups pairs that share one graph. Pair joins the first group
+    whose languages are similar enough to languages of the pair
+    (|common| >= overlap * |all|), languages of the group become
+    languages of all its pairs. Pairs with more languages are placed
+    first. Groups with more work (pairs, then languages) go first.
+    
+    With overlap=1 only pairs with the same languages are grouped, so
+    results are the same as from get_translations for every pair.
+    
+    :param pairs (list): pairs of languages
+    :param n (int): number of best languages of every pair
+    :param overlap (float): minimal share of common languages
+    
+    :return: groups: languages, pairs
+    :rtype: list
+    """
+    languages = {pair: graph_languages(pair[0], pair[1], n=n) for pair in pairs}
+    groups = []
+    for pair in sorted(pairs, key=lambda x: -len(languages[x])):
+        for group in groups:
+            if len(group[0] & languages[pair]) >= overlap * len(group[0] | languages[pair]):
+                group[0].update(languages[pair])
+                group[1].append(pair)
+                break
+        else: groups.append((set(languages[pair]), [pair]))
+    return sorted(groups, key=lambda x: (-len(x[1]), -len(x[0])))
+
+def translate_group(languages, pairs, cutoff=4, topn=None, engine='networkx'):
+    """
+    Preview files for all pairs of a group from one graph. Every
+    language is translated into all other languages of its pairs at
+    once (translate_multi), so every dictionary is loaded and every
+    word is searched once. A preview file is written as soon as both
+    directions of the pair are done.
+    
+    :param languages (set): languages of graph
+    :param pairs (list): pairs of languages
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    
+    :return: pair, number of entries, seconds from start of the group
+    for every pair
+    :rtype: list
+    """
+    start = time.time()
+    SEARCH_CACHE.clear()
+    G = languages_graph(languages, engine=engine)
+    targets = {}
+    for lang1, lang2 in pairs:
+        for a, b in [(lang1, lang2), (lang2, lang1)]:
+            if b not in targets.setdefault(a, []): targets[a].append(b)
+    found, done, written, stats = {}, set(), set(), []
+    for lang in sorted(targets, key=lambda x: -len(targets[x])):
+        for i, results in translate_multi(G, dictionary(lang), targets[lang], cutoff=cutoff, topn=topn):
+            for lang2 in results: found.setdefault((lang, lang2), []).append((i, results[lang2]))
+        done.add(lang)
+        for lang1, lang2 in pairs:
+            if (lang1, lang2) in written or lang1 not in done or lang2 not in done: continue
+            written.add((lang1, lang2))
+            RESULT = {}
+            for i, result in found.get((lang1, lang2), []):
+                for j in result: RESULT[(i, j[0])] = [j[1], 0]
+            for i, result in found.get((lang2, lang1), []):
+                for j in result:
+                    if (j[0], i) in RESULT: RESULT[(j[0], i)][1] = j[1]
+                    else: RESULT[(j[0], i)] = [0, j[1]]
+            write_preview(lang1, lang2, RESULT)
+            stats.append(((lang1, lang2), len(RESULT), time.time() - start))
+            logging.info('{}-{}: {} entries, {:.1f} s'.format(lang1, lang2, len(RESULT), time.time() - start))
+    return stats
+
+def _translate_group(args):
+    """translate_group in a worker process"""
+    return translate_group(*args)
+
+def batch(input='pairs.txt', n=10, cutoff=4, topn=None, engine='networkx', jobs=1, overlap=0.8):
+    """
+    Preview files for all pairs from input file. Pairs with similar
+    languages are grouped and share one graph (group_pairs), groups are
+    run in jobs worker processes (biggest first). Every group reads or
+    writes its graph snapshot, so the next batch with the same inputs
+    doesn't build graphs.
+    
+    :param input (str): file with pairs (see read_pairs)
+    :param n (int): number of best languages of every pair
+    :param cutoff (int): cutoff
+    :param topn (None, int): how many best candidates we want to get
+    (None for 'auto' mode, int for certain number)
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param jobs (int): number of worker processes
+    :param overlap (float): minimal share of common languages for
+    pairs in one graph (see group_pairs)
+    
+    :return: pair, number of entries, seconds from start of its group
+    for every pair
+    :rtype: list
+    """
+    start = time.time()
+    pairs = read_pairs(input)
+    groups = group_pairs(pairs, n=n, overlap=overlap)
+    logging.info('{} pairs in {} groups'.format(len(pairs), len(groups)))
+    for languages, group in groups:
+        logging.info('group: {} ({} languages)'.format(' '.join('-'.join(i) for i in group), len(languages)))
+    tasks = [(languages, group, cutoff, topn, engine) for languages, group in groups]
+    stats, finished = [], 0
+    if jobs > 1 and len(tasks) > 1:
+        pool = Pool(min(jobs, len(tasks)))
+        results = pool.imap_unordered(_translate_group, tasks)
+    else:
+        pool = None
+        results = (translate_group(*i) for i in tasks)
+    try:
+        for result in results:
+            stats.extend(result)
+            finished += len(result)
+            logging.info('{}/{} pairs, {:.1f} s'.format(finished, len(pairs), time.time() - start))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    for pair, entries, seconds in stats:
+        print('{}-{}\t{}\t{:.1f}'.format(pair[0], pair[1], entries, seconds))
+    logging.info('batch: {:.1f} s'.format(time.time() - start))
+    return stats
+
+# SERVER
+
+def _answer(query):
+    """
+    Answers one query of lemma server (graph, lemma index, languages
+    and maximal cutoff from SHARED, see serve).
+    
+    :param query (dict): lemma, lang (source language, the first one by
+    default), tags, cutoff, topn
+    
+    :return: JSON-ready answer: words with this lemma and their
+    translations with coefficients
+    :rtype: dict
+    """
+    G, lemmas, langs = SHARED['graph'], SHARED['lemmas'], SHARED['langs']
+    lang = query.get('lang', langs[0])
+    if lang not in langs: return {'error': 'unknown language: {}'.format(lang)}
+    target = langs[1] if lang == langs[0] else langs[0]
+    try:
+        cutoff = int(query.get('cutoff', 4))
+        topn = int(query['topn']) if query.get('topn') else None
+    except ValueError: return {'error': 'cutoff and topn must be integers'}
+    if not 1 <= cutoff <= SHARED['max_cutoff']:
+        return {'error': 'cutoff must be from 1 to {}'.format(SHARED['max_cutoff'])}
+    words = lemmas.get((lang, query['lemma']), [])
+    if query.get('tags'):
+        probe = Word(query['lemma'], lang, Tags([i for i in query['tags'].split('-') if i]))
+        words = [i for i in words if i == probe]
+    results = []
+    for word in words:
+        candidates = possible_translations(G, word, target, cutoff=cutoff)
+        translations = evaluate(G, word, candidates, cutoff=cutoff, topn=topn)
+        results.append({'word': str(word), 'translations': [{'word': str(i), 'lemma': i.lemma, 'tags': i.write(mode='out').split('\t')[1], 'coefficient': float(c)} for i, c in translations]})
+    return {'lemma': query['lemma'], 'lang': lang, 'target': target, 'results': results}
+
+def _answer_batch(queries):
+    """Answers a batch of queries in one worker call"""
+    return [_answer(i) for i in queries]
+
+class QueryBatcher:
+    """
+    Collects queries from concurrent requests and sends them to the
+    executor in batches (one task for everything that came while the
+    previous batch was sent).
+    """
+    def __init__(self, executor, size=64):
+        self.executor = executor
+        self.size = size
+        self.queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+    
+    def submit(self, query):
+        """
+        :param query (dict): query (see _answer)
+        
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        self.queue.put((query, future))
+        return future
+    
+    def _loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.size:
+                try: batch.append(self.queue.get_nowait())
+                except queue.Empty: break
+            task = self.executor.submit(_answer_batch, [i[0] for i in batch])
+            task.add_done_callback(lambda task, batch=batch: self._done(task, batch))
+    
+    @staticmethod
+    def _done(task, batch):
+        if task.exception() is not None:
+            for query, future in batch: future.set_exception(task.exception())
+        else:
+            for (query, future), result in zip(batch, task.result()): future.set_result(result)
+
+def serve(lang1, lang2, n=10, host='127.0.0.1', port=8000, jobs=1, engine='networkx', max_cutoff=5):
+    """
+    Resident lemma server: graph and dictionaries are loaded once, then
+    queries are answered over HTTP with JSON:
+    
+    GET /lemma?lemma=mother&lang=eng&topn=3&cutoff=4&tags=n
+    
+    (lang - source language, lang1 by default, translations are into
+    the other language of the pair; tags, topn and cutoff are optional,
+    cutoff can't be bigger than max_cutoff: number of paths grows
+    exponentially with it)
+    
+    Every request has its own thread. Queries are batched (see
+    QueryBatcher) and scored in jobs worker processes forked after
+    loading (one thread of this process if jobs = 1), so search cache
+    of every worker is warm for next queries. Workers are started
+    before any thread of the server (forking a process with threads
+    can deadlock).
+    
+    :param lang1, lang2 (str): languages
+    :param n (int): number of best languages to use in graph
+    :param host (str): host
+    :param port (int): port
+    :param jobs (int): number of worker processes
+    :param engine (str): graph engine - 'networkx' or 'csr' (see
+    load_graph)
+    :param max_cutoff (int): maximal cutoff of queries (bigger ones
+    get 400)
+    """
+    logging.info('Initialization')
+    G = load_graph(lang1, lang2, n=n, engine=engine)
+    l1, l2 = dictionaries(lang1, lang2)
+    lemmas = {}
+    for word in sorted([i for i in l1 | l2 if i in G], key=str):
+        lemmas.setdefault((word.lang, word.lemma), []).append(word)
+    SHARED.update({'graph': G, 'lemmas': lemmas, 'langs': (lang1, lang2), 'max_cutoff': max_cutoff})
+    if jobs > 1:
+        # no threads while workers are forked: tqdm monitor is stopped,
+        # workers are started by tasks from this thread (see warm-up)
+        if tqdm.monitor is not None: tqdm.monitor.exit()
+        try: executor = ProcessPoolExecutor(jobs, mp_context=get_context('fork'))
+        except ValueError: executor = ProcessPoolExecutor(jobs, initializer=_share, initargs=(dict(SHARED),))
+        for task in [executor.submit(_answer_batch, []) for i in range(jobs)]: task.result()
+    else: executor = ThreadPoolExecutor(1)
+    batcher = QueryBatcher(executor)
+    
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, answer):
+            body = json.dumps(answer, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/lemma': return self._send(404, {'error': 'unknown path: {}'.format(url.path)})
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if 'lemma' not in query: return self._send(400, {'error': 'lemma is required'})
+            try: answer = batcher.submit(query).result()
+            except Exception as e: return self._send(500, {'error': str(e)})
+            self._send(400 if 'error' in answer else 200, answer)
+        
+        def log_message(self, format, *args): logging.debug(format % args)
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    logging.info('Serving {}-{} on http://{}:{}/lemma'.format(lang1, lang2, host, server.server_port))
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        executor.shutdown()